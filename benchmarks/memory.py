@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# coding:utf-8
+
+"""
+benchmark: bytes per state of the graphs and automata of patterns
+
+usage: python benchmarks/memory.py [length ...]
+
+the states of the parser are measured against the previous ones, which
+had a `__dict__` and kept their edges in a dict of lists; the NFA is
+measured as nested maps (`FA`) and as flat arrays (`CompactNFA`)
+"""
+
+import os
+import string
+import sys
+from sys import getsizeof
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import yare
+from yare.compact import CompactNFA
+from yare.parser import parse
+
+class LegacyState:
+    """the previous state, see `yare.regex.State`"""
+    def __init__(self, name):
+        self.name = name
+        self.move = {}
+    def link(self, state, edge):
+        """link to state via edge"""
+        self.move.setdefault(edge, [])
+        if state not in self.move[edge]:
+            self.move[edge].append(state)
+        return state
+
+def all_states(graph):
+    """return the states of `graph`"""
+    seen = { graph.start.name: graph.start }
+    stack = [ graph.start ]
+    while stack:
+        for _, state in stack.pop().move:
+            if state.name not in seen:
+                seen[state.name] = state
+                stack.append(state)
+    return seen.values()
+
+def state_bytes(state):
+    """return the bytes taken by `state` and its edges, labels excepted"""
+    return getsizeof(state) + getsizeof(state.move) + \
+        sum(getsizeof(pair) for pair in state.move)
+
+def legacy_bytes(states):
+    """return the bytes taken by the legacy copies of `states`"""
+    copies = dict((state.name, LegacyState(state.name)) for state in states)
+    for state in states:
+        for edge, target in state.move:
+            copies[state.name].link(copies[target.name], edge)
+    return sum(getsizeof(copy) + getsizeof(copy.__dict__) +
+               getsizeof(copy.move) +
+               sum(getsizeof(targets) for targets in copy.move.itervalues())
+               for copy in copies.itervalues())
+
+def families(length):
+    """return patterns of about `length` characters, by name"""
+    letters = string.ascii_letters
+    words = [ letters[i % 52] + letters[i // 52 % 52] + letters[i // 2704]
+              for i in xrange(length // 4) ]
+    return [
+        ('select', yare.select(words)),
+        ('loops', ''.join(yare.loop(letters[i % 52])
+                          for i in xrange(length // 5))),
+    ]
+
+def main(lengths):
+    """run the benchmark for patterns of the given lengths"""
+    print '%-8s %8s %12s %12s %12s %12s' % ('family', 'states',
+        'legacy(B/s)', 'State(B/s)', 'FA(B/s)', 'compact(B/s)')
+    for length in lengths:
+        for name, pattern in families(length):
+            graph = parse(pattern)
+            states = all_states(graph)
+            nfa = graph.make_nfa()
+            nfa.close()
+            fa_bytes = nfa.memory() + getsizeof(nfa.__epsilon_clos__) + \
+                sum(getsizeof(closure)
+                    for closure in nfa.__epsilon_clos__.itervalues())
+            count = float(len(states))
+            print '%-8s %8d %12.1f %12.1f %12.1f %12.1f' % (name,
+                len(states), legacy_bytes(states) / count,
+                sum(state_bytes(state) for state in states) / count,
+                fa_bytes / count, CompactNFA(nfa).memory() / count)
+
+if __name__ == '__main__':
+    main([ int(arg) for arg in sys.argv[1:] ] or [1000, 10000])
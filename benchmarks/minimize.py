@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# coding:utf-8
+
+"""
+benchmark: Hopcroft minimization against the previous naive algorithm
+
+usage: python benchmarks/minimize.py [size ...]
+
+every DFA is made of interleaved copies of a smaller one: 4 copies,
+which give many small classes of equivalent states, and copies of a
+`LARGE_BASE`-state DFA, which give a few classes as large as a fraction
+of the DFA
+
+the naive algorithm is roughly cubic, so it is skipped for DFAs larger
+than `NAIVE_LIMIT` states
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from yare.fa import FA
+
+NAIVE_LIMIT = 2000
+LARGE_BASE = 64
+ALPHABET = 'abcd'
+
+def random_dfa(size, seed=0, copies=4):
+    """
+    return a random DFA of `size` nodes with a few missing edges, made of
+    `copies` interleaved copies of a smaller DFA, so that it minimizes to
+    about size/copies nodes
+    """
+    rand = random.Random(seed)
+    base = max(size // copies, 1)
+    edges = [ { edge: rand.randrange(base) for edge in ALPHABET
+                if rand.random() < 0.9 } for _ in xrange(base) ]
+    finals = { node for node in xrange(base) if rand.random() < 0.3 }
+    fa = FA()
+    for node in xrange(size):
+        for edge, dst in edges[node % base].items():
+            fa.connect(node, dst + base * rand.randrange(copies), edge)
+    fa.set_start(0)
+    for node in xrange(size):
+        if node % base in finals:
+            fa.add_final(node)
+    return fa
+
+def naive_partition(fa, group, groups):
+    """the partition step of the previous `FA.minimize`"""
+    if len(group) < 2:
+        return None
+    fa_map = fa.map()
+    acceptable_edges = {}
+    for node in group:
+        edges = set()
+        if node in fa_map:
+            for edge in fa.__acceptable__:
+                if edge in fa_map[node]:
+                    edges.add(edge)
+        acceptable_edges.setdefault(tuple(edges), set())
+        acceptable_edges[tuple(edges)].add(node)
+    parti = []
+    for edges in acceptable_edges:
+        local_parti = {}
+        for node in acceptable_edges[edges]:
+            edge_next_pair = set()
+            for edge in edges:
+                idx = [ list(fa_map[node][edge])[0] in g
+                        for g in groups ].index(True)
+                edge_next_pair.add((edge, idx))
+            edge_next_t = tuple(edge_next_pair)
+            local_parti.setdefault(edge_next_t, set())
+            local_parti[edge_next_t].add(node)
+        parti += [ list(local_parti[p]) for p in local_parti ]
+    if len(parti) > 1:
+        return parti
+    return None
+
+def naive_minimize(fa):
+    """the previous `FA.minimize`, returning the number of groups"""
+    from copy import deepcopy
+    finals = fa.final_nodes()
+    groups = [finals, fa.__nodes__.difference(finals)]
+    new_groups = deepcopy(groups)
+    parti = True
+    while parti:
+        delete = None
+        for group in groups:
+            parti = naive_partition(fa, group, groups)
+            if parti:
+                delete = group
+                break
+        if parti:
+            new_groups.remove(delete)
+            new_groups += parti
+            groups = deepcopy(new_groups)
+    return len(groups)
+
+def timed(func, *args):
+    """return the result of func(*args) and the seconds it took"""
+    begin = time.time()
+    result = func(*args)
+    return result, time.time() - begin
+
+def main(sizes):
+    """run the benchmark for DFAs of the given sizes"""
+    print '%8s %8s %12s %12s %10s' % ('states', 'classes', 'hopcroft(s)',
+        'naive(s)', 'minimal')
+    for size in sizes:
+        for copies in [ 4, max(size // LARGE_BASE, 1) ]:
+            fa = random_dfa(size, copies=copies)
+            new, hopcroft = timed(fa.minimize)
+            if size <= NAIVE_LIMIT:
+                naive = '%12.3f' % timed(naive_minimize, fa)[1]
+            else:
+                naive = '%12s' % 'skipped'
+            print '%8d %8s %12.3f %s %10d' % (size,
+                'small' if copies == 4 else 'large', hopcroft, naive,
+                len(new.__nodes__))
+
+if __name__ == '__main__':
+    main([ int(arg) for arg in sys.argv[1:] ] or
+        [1000, 2000, 5000, 10000, 100000])
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# coding:utf-8
+
+"""
+benchmark: parsing long generated patterns
+
+usage: python benchmarks/parse.py [length ...]
+"""
+
+import os
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import yare
+from yare.parser import parse
+
+def families(length):
+    """return patterns of about `length` characters, by name"""
+    letters = string.ascii_letters
+    words = [ letters[i % 52] + letters[i // 52 % 52] + letters[i // 2704]
+              for i in xrange(length // 4) ]
+    return [
+        ('literal', ''.join(letters[i % 52] for i in xrange(length))),
+        ('select', yare.select(words)),
+        ('loops', ''.join(yare.loop(letters[i % 52])
+                          for i in xrange(length // 5))),
+    ]
+
+def main(lengths):
+    """run the benchmark for patterns of the given lengths"""
+    print '%-8s %10s %10s' % ('family', 'length', 'parse(s)')
+    for length in lengths:
+        for name, pattern in families(length):
+            begin = time.time()
+            parse(pattern)
+            print '%-8s %10d %10.3f' % (name, len(pattern),
+                time.time() - begin)
+
+if __name__ == '__main__':
+    main([ int(arg) for arg in sys.argv[1:] ] or [1000, 10000, 100000])
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# coding:utf-8
+
+"""
+benchmark suite: compile phases and matching, written as JSON
+
+usage: python benchmarks/run.py [--max-size BYTES] [--repeat N]
+           [--engine dfa|codegen|lazy|nfa] [--family NAME ...]
+           [--output FILE] [--baseline FILE]
+
+every compile phase (`parse`, `make_nfa`, `make_dfa`, `minimize`,
+`table`) is timed for every pattern family, then `match` and
+`match_prefix` on inputs of 10 bytes, 100 bytes, 1 KB and so on up to
+`--max-size`, 100 MB by default, which is always run; the best of
+`--repeat` runs is kept; the default sweep takes minutes, a smaller
+`--max-size` gives a quick run
+
+inputs repeat a block, random but seeded by the family name, so two
+runs of the same tree see the same data, whichever families are run;
+with `--baseline`, the ratio of every timing to the one of an earlier
+run is printed to stderr
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import yare
+from yare.parser import parse
+from yare.regex import RegEx
+from yare.table import Table
+
+ENGINES = { 'dfa': True, 'codegen': 'codegen', 'lazy': 'lazy', 'nfa': False }
+MAX_SIZE = 10 ** 8
+SEED = 0
+BLOCK_SIZE = 1 << 16
+
+def families():
+    """
+    return (name, pattern, maker of the block of the inputs, suffix of
+    the inputs) of every family, see `random_block`
+
+    the inputs run the automaton over their whole length: they neither
+    miss the literals the prefilter looks for nor leave the length
+    bounds of the pattern
+    """
+    letters = string.ascii_lowercase
+    literal = letters * 2
+    # every string over `abcdef` is a prefix of a match
+    nested = yare.loop('f')
+    for char in 'edcba':
+        nested = yare.loop(yare.concat([ yare.loop(char), nested ]))
+    return [
+        ('literal', yare.loop(literal),
+         lambda rand: literal * (BLOCK_SIZE // len(literal)), ''),
+        ('wildcard', yare.concat([ yare.loop(yare.WILDCARD), 'needle',
+                                   yare.loop(yare.WILDCARD) ]),
+         random_block(string.printable), 'needle'),
+        ('nested', nested, random_block('abcdef'), ''),
+        ('exponential', '(a|b)*a' + '(a|b)' * 10, random_block('ab'), ''),
+    ]
+
+def random_block(alphabet):
+    """return a maker of blocks of random characters of `alphabet`"""
+    return lambda rand: ''.join(rand.choice(alphabet)
+                                for _ in xrange(BLOCK_SIZE))
+
+def sizes(max_size):
+    """
+    return the input sizes, from 10 bytes up to `max_size` by powers of
+    ten, `max_size` included
+    """
+    result = []
+    size = 10
+    while size < max_size:
+        result.append(size)
+        size *= 10
+    result.append(max_size)
+    return result
+
+def best(repeat, func, *args):
+    """return the best time of `repeat` calls, and the last result"""
+    times = []
+    for _ in xrange(repeat):
+        begin = time.time()
+        result = func(*args)
+        times.append(time.time() - begin)
+    return min(times), result
+
+def run(family_names, engine, max_size, repeat):
+    """run the benchmark, return the list of the results"""
+    results = []
+    for name, pattern, make_block, suffix in families():
+        if family_names and name not in family_names:
+            continue
+        record = lambda phase, seconds, size=None: results.append({
+            'family': name, 'phase': phase, 'input_size': size,
+            'seconds': seconds,
+        })
+        seconds, graph = best(repeat, parse, pattern)
+        record('parse', seconds)
+        seconds, nfa = best(repeat, graph.make_nfa)
+        record('make_nfa', seconds)
+        seconds, dfa = best(repeat, nfa.make_dfa)
+        record('make_dfa', seconds)
+        seconds, minimal = best(repeat,
+                                lambda: dfa.minimize().relabel())
+        record('minimize', seconds)
+        seconds, _ = best(repeat, Table, minimal)
+        record('table', seconds)
+        regex = RegEx(nfa, pattern, ENGINES[engine])
+        block = make_block(random.Random('%d:%s' % (SEED, name)))
+        for size in sizes(max_size):
+            text = (block * (size // len(block) + 1))[:size - len(suffix)]
+            text += suffix
+            record('match', best(repeat, regex.match, text)[0], size)
+            record('match_prefix',
+                   best(repeat, regex.match_prefix, text)[0], size)
+    return results
+
+def compare(results, baseline):
+    """print the ratio of every result to the same one in `baseline`"""
+    key = lambda result: (result['family'], result['phase'],
+                          result['input_size'])
+    old = { key(result): result['seconds']
+            for result in baseline['results'] }
+    for result in results:
+        before = old.get(key(result))
+        if before:
+            sys.stderr.write('%-12s %-13s %10s %8.2fx\n' % (
+                result['family'], result['phase'],
+                result['input_size'] or '', result['seconds'] / before))
+
+def main():
+    """parse the command line and run the benchmark"""
+    parser = argparse.ArgumentParser(
+        description='benchmark compile phases and matching')
+    parser.add_argument('--max-size', type=int, default=MAX_SIZE,
+                        help='largest input, in bytes (default: %d)'
+                        % MAX_SIZE)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs of every timing, the best is kept')
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='dfa',
+                        help='matching engine, see `yare.compile`')
+    parser.add_argument('--family', action='append', default=[],
+                        help='run only this family, may be repeated')
+    parser.add_argument('--output', help='write the JSON to this file')
+    parser.add_argument('--baseline',
+                        help='JSON of an earlier run to compare with')
+    args = parser.parse_args()
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'engine': args.engine,
+        'repeat': args.repeat,
+        'seed': SEED,
+        'results': run(args.family, args.engine, args.max_size,
+                       args.repeat),
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as out:
+            out.write(text + '\n')
+    else:
+        print text
+    if args.baseline:
+        with open(args.baseline) as source:
+            compare(report['results'], json.load(source))
+
+if __name__ == '__main__':
+    main()
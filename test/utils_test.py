@@ -13,8 +13,9 @@ class TestUtils(unittest.TestCase):
     def test_escape(self):
         """test : escape"""
         cases = zip(list('abcde'), list('abcde')) + \
-            zip('()|*\\ea',
-                ['\(', '\)', '\|', '\*', '\\\\', 'e', 'a'])
+            zip('()|*\\ea+?{}',
+                ['\(', '\)', '\|', '\*', '\\\\', 'e', 'a', '\+', '\?',
+                 '\{', '\}'])
         for case in cases:
             self.assertEqual(yare.escape(case[0]), case[1])
 
@@ -71,18 +72,28 @@ class TestUtils(unittest.TestCase):
     def test_loop_(self):
         """test : loop_"""
         cases = [
-            ('abcde', '((abcde)((abcde)*))'),
+            ('abcde', '((abcde)+)'),
         ]
         for case in cases:
             self.assertEqual(yare.loop_(case[0]), case[1])
 
+    def test_repeat(self):
+        """test : repeat"""
+        cases = [
+            (('ab', 2, 5), '((ab){2,5})'),
+            (('ab', 2), '((ab){2,})'),
+            (('ab', 3, 3), '((ab){3})'),
+        ]
+        for case in cases:
+            self.assertEqual(yare.repeat(*case[0]), case[1])
+
     def test_optional(self):
         """test : optional"""
         cases = [
-            ('a', '(a|\\e)'),
-            ('ab', '(ab|\\e)'),
-            ('ab|\\e', '(ab|\\e|\\e)'),
-            ('a|b', '(a|b|\\e)'),
+            ('a', '((a)?)'),
+            ('ab', '((ab)?)'),
+            ('ab|\\e', '((ab|\\e)?)'),
+            ('a|b', '((a|b)?)'),
         ]
         for case in cases:
             self.assertEqual(yare.optional(case[0]), case[1])
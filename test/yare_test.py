@@ -300,6 +300,735 @@ class TestCase6(unittest.TestCase):
         for case in partial:
             self.assertEqual(self.__regex__.match_prefix(case[0]), case[1])
 
+class TestRepeat(unittest.TestCase):
+    """test case : native `+`, `?` and `{m,n}`"""
+    def test_match(self):
+        """test that they agree with their expansions"""
+        import itertools
+        patterns = [ ('a+', 'aa*'), ('(ab)?c', '(ab|\\e)c'),
+            ('a{2,3}', 'aa(a|\\e)'), ('(a|b){2,}', '(a|b)(a|b)(a|b)*'),
+            ('a{3}', 'aaa'), ('a{,2}b', '(\\e|a|aa)b'), ('a{0}b', 'b'),
+            ('(a*b){1,2}', 'a*b(a*b|\\e)') ]
+        cases = [ ''.join(chars) for size in xrange(6)
+            for chars in itertools.product('ab', repeat=size) ]
+        for pattern, expansion in patterns:
+            for dfa in [ True, False ]:
+                regex = yare.compile(pattern, dfa)
+                expanded = yare.compile(expansion, dfa)
+                for case in cases:
+                    self.assertEqual(regex.match(case), expanded.match(case))
+    def test_size(self):
+        """test that the NFA grows with the count, not the pattern"""
+        regex = yare.compile(yare.DIGIT + '{1,20}', dfa=False)
+        self.assertEqual(regex.stats()['nfa']['states'], 42)
+        self.assertTrue(regex.match('1' * 20))
+        self.assertFalse(regex.match('1' * 21))
+    def test_escape(self):
+        """test escaped quantifiers and invalid repetitions"""
+        self.assertTrue(yare.compile('a\\+\\?\\{2\\}').match('a+?{2}'))
+        for pattern in [ 'a{', 'a{2', 'a{3,1}', 'a{x}', 'a{,}', '+a',
+                         'a{1000000000}', 'a{65536,}', 'a{,65536}' ]:
+            self.assertRaises(SyntaxError, yare.compile, pattern)
+
+class TestTable(unittest.TestCase):
+    """test case : table-driven DFA agrees with the NFA"""
+    def test_agreement(self):
+        """test methods `match` and `match_prefix` on both engines"""
+        import itertools
+        patterns = [ 'a|\\e', 'a*b|cd', 'a*(b|c)d', '(a|b)*a(a|b)' ]
+        cases = [ ''.join(chars) for size in xrange(5)
+            for chars in itertools.product('abcdx', repeat=size) ]
+        for pattern in patterns:
+            dfa = yare.compile(pattern)
+            nfa = yare.compile(pattern, dfa=False)
+            lazy = yare.compile(pattern, dfa='lazy')
+            for case in cases:
+                self.assertEqual(dfa.match(case), nfa.match(case))
+                self.assertEqual(dfa.match_prefix(case),
+                    nfa.match_prefix(case))
+                self.assertEqual(lazy.match(case), nfa.match(case))
+                self.assertEqual(lazy.match_prefix(case),
+                    nfa.match_prefix(case))
+
+class TestAnalysis(unittest.TestCase):
+    """test case : dead states, accept-sinks and length bounds"""
+    def test_lengths(self):
+        """test method `lengths` of tables"""
+        self.assertEqual(yare.compile('abc|de').table().lengths(), (2, 3))
+        self.assertEqual(yare.compile('a(b|c)*').table().lengths(),
+            (1, None))
+        self.assertEqual(yare.compile('a|\\e').table().lengths(), (0, 1))
+        regex = yare.compile('abc|de')
+        self.assertFalse(regex.match('abcd'))
+        self.assertTrue(regex.match('xabc', 1))
+        self.assertEqual(regex.match_prefix('d'), 0)
+        self.assertEqual(regex.search('xd'), None)
+    def test_dead(self):
+        """test that states which cannot accept are merged"""
+        from yare.fa import FA
+        from yare.table import Table
+        fa = FA()
+        fa.connect(0, 1, 'a')
+        fa.connect(0, 2, 'b')
+        fa.connect(2, 2, 'b')
+        fa.set_start(0)
+        fa.add_final(1)
+        table = Table(fa)
+        self.assertEqual(table.size(), 3)
+        self.assertFalse(table.validate('bbb'))
+        self.assertTrue(table.validate('a'))
+    def test_sink(self):
+        """test accept-sinks of byte tables"""
+        any_byte = yare.select([ yare.escape(chr(byte))
+                                 for byte in xrange(256) ])
+        regex = yare.compile('ab' + yare.loop(any_byte), bytes=True)
+        table = regex.table()
+        self.assertTrue(table.is_sink(table.feed(table.initial(), 'ab')[0]))
+        self.assertFalse(table.is_sink(table.initial()))
+        self.assertTrue(regex.match('ab\xff\x00c'))
+        self.assertFalse(regex.match('a\xff\x00c'))
+        self.assertEqual(regex.match_prefix(bytearray('xab\xff'), 1), 3)
+        self.assertEqual(regex.findall('xxab\x01'), ['ab\x01'])
+
+class TestBatch(unittest.TestCase):
+    """test case : matching a batch of strings"""
+    def test_agreement(self):
+        """test methods `match_many` and `match_prefix_many`"""
+        import itertools
+        import yare.table
+        cases = [ ''.join(chars) for size in [ 0, 5, 1, 3, 2, 4 ]
+            for chars in itertools.product('abcx', repeat=size) ]
+        numpy = yare.table.numpy
+        for pattern in [ '(a|b)*a(a|b)', 'a*b|cd', 'a|\\e' ]:
+            regex = yare.compile(pattern)
+            match = [ regex.match(case) for case in cases ]
+            prefix = [ regex.match_prefix(case) for case in cases ]
+            try:
+                for table_numpy in set([ numpy, None ]):
+                    yare.table.numpy = table_numpy
+                    self.assertEqual(list(regex.match_many(cases)), match)
+                    self.assertEqual(list(regex.match_prefix_many(cases)),
+                        prefix)
+                    self.assertEqual(regex.match_many([]), [])
+            finally:
+                yare.table.numpy = numpy
+            self.assertEqual(list(yare.compile(pattern, dfa=False)
+                .match_many(cases)), match)
+    def test_mixed(self):
+        """test batches mixing types of strings"""
+        regex = yare.compile('ab|cd')
+        cases = [ u'ab', 'a\xe9', bytearray('ab'), 'cd', u'cd', 'b' ]
+        match = [ regex.match(case) for case in cases ]
+        self.assertEqual(regex.match_many(cases), match)
+        self.assertEqual(regex.match_prefix_many(cases),
+            [ regex.match_prefix(case) for case in cases ])
+        regex = yare.compile('ab|cd', bytes=True)
+        table = regex.table()
+        cases = [ 'ab', bytearray('cd'), buffer('xab', 1), 'a\xe9', 'cd' ]
+        match = [ regex.match(case) for case in cases ]
+        self.assertEqual(match, [ True, True, True, False, True ])
+        self.assertEqual(regex.match_many(cases), match)
+        self.assertEqual(regex.match_prefix_many(cases),
+            [ regex.match_prefix(case) for case in cases ])
+        for method in [ table.match_many, table.match_prefix_many ]:
+            self.assertRaises(TypeError, method, [ u'ab', u'cd' ])
+            self.assertRaises(TypeError, method, [ 'ab', u'cd' ])
+        for dfa in [ True, False, 'lazy' ]:
+            regex = yare.compile('a*b', dfa)
+            self.assertEqual(type(regex.match_many([ 'ab', 'a' ])), list)
+            self.assertEqual(regex.match_many([ 'ab', 'a' ]), [ True, False ])
+            self.assertEqual(regex.match_prefix_many([ 'ab', 'a' ]), [ 2, 0 ])
+
+class TestMinimize(unittest.TestCase):
+    """test case : minimization of the DFA"""
+    def test_size(self):
+        """test the number of nodes of minimal DFAs"""
+        cases = [
+            ('ab', 3),
+            ('a*b|cd', 4),
+            ('(a|b)*a(a|b)', 4),
+            ('(a|b)*a(a|b)(a|b)(a|b)', 16),
+        ]
+        for case in cases:
+            regex = yare.compile(case[0])
+            self.assertEqual(len(regex.__fa__.__nodes__), case[1])
+
+class TestSubset(unittest.TestCase):
+    """test case : subset construction"""
+    def test_size(self):
+        """test the number of nodes of DFAs before minimization"""
+        from yare.regex import build_nfa
+        cases = [
+            ('abc|abd', 5),
+            ('(a|b)*a(a|b)', 5),
+            ('(a|b)*a(a|b)(a|b)(a|b)', 17),
+        ]
+        for pattern, size in cases:
+            dfa = build_nfa(pattern).make_dfa()
+            self.assertEqual(dfa.size(), size)
+            self.assertEqual(dfa.start_node(), 0)
+            self.assertEqual(dfa.__nodes__, set(xrange(size)))
+
+class TestCharset(unittest.TestCase):
+    """test case : selections between characters"""
+    def test_size(self):
+        """test that a selection between characters is a single edge"""
+        regex = yare.compile(yare.loop(yare.WILDCARD))
+        self.assertEqual(len(regex.__fa__.__nodes__), 1)
+        nfa = yare.compile(yare.WILDCARD, dfa=False).__fa__
+        self.assertEqual(len(nfa.__nodes__), 2)
+    def test_match(self):
+        """test method `match`"""
+        regex = yare.compile(yare.concat([yare.loop(yare.WILDCARD), 'x',
+            yare.diff(list('abc'))]))
+        positive = [ 'xd', 'axx', '(|*)x\\' ]
+        negative = [ '', 'x', 'xa', 'xc', 'dxab', '\x80xd' ]
+        for case in positive:
+            self.assertTrue(regex.match(case))
+        for case in negative:
+            self.assertFalse(regex.match(case))
+
+class TestSearch(unittest.TestCase):
+    """test case : unanchored search"""
+    @staticmethod
+    def naive_finditer(regex, string):
+        """leftmost-longest matches by trying every substring"""
+        idx = 0
+        while idx <= len(string):
+            ends = [ end for end in xrange(idx, len(string) + 1)
+                     if regex.match(string[idx:end]) ]
+            if ends:
+                yield (idx, ends[-1])
+                idx = ends[-1] if ends[-1] > idx else idx + 1
+            else:
+                idx += 1
+    def test_finditer(self):
+        """test method `finditer` against a naive search"""
+        patterns = [ 'a*b|cd', 'a*', '(a|b)*a(a|b)', 'a|\\e', 'ab' ]
+        cases = [ '', 'x', 'xxaabcdcdb ab', 'baab', 'bbbabbaba',
+            'cdcdxab' ]
+        for pattern in patterns:
+            for dfa in [ True, False, 'lazy' ]:
+                regex = yare.compile(pattern, dfa)
+                for case in cases:
+                    self.assertEqual(list(regex.finditer(case)),
+                        list(self.naive_finditer(regex, case)))
+    def test_search(self):
+        """test methods `search` and `findall`"""
+        regex = yare.compile('a*b|cd')
+        self.assertEqual(regex.search('xxaabcd'), (2, 5))
+        self.assertEqual(regex.search('xxaabcd', 3), (3, 5))
+        self.assertEqual(regex.search('xxaabcd', 5), (5, 7))
+        self.assertEqual(regex.search('xxaa'), None)
+        self.assertEqual(regex.search('ab', 3), None)
+        self.assertEqual(yare.findall(regex, 'xxaabcdcdb ab'),
+            [ 'aab', 'cd', 'cd', 'b', 'ab' ])
+
+class TestStream(unittest.TestCase):
+    """test case : matching over chunks"""
+    def test_matcher(self):
+        """test method `matcher`"""
+        for dfa in [ True, False, 'lazy' ]:
+            matcher = yare.compile('(a|b)*a(a|b)', dfa).matcher()
+            self.assertEqual(matcher.longest_match_so_far(), -1)
+            matcher.feed('bb').feed('ab')
+            self.assertTrue(matcher.is_accepting())
+            matcher.feed('bb')
+            self.assertFalse(matcher.is_accepting())
+            self.assertEqual(matcher.longest_match_so_far(), 4)
+            matcher.feed('c').feed('aa')
+            self.assertTrue(matcher.is_dead())
+            self.assertEqual(matcher.longest_match_so_far(), 4)
+            self.assertEqual(matcher.consumed(), 9)
+            matcher.reset().feed('aa')
+            self.assertEqual(matcher.longest_match_so_far(), 2)
+    def test_match_stream(self):
+        """test method `match_stream`"""
+        from StringIO import StringIO
+        regex = yare.compile('(ab)*')
+        self.assertTrue(regex.match_stream(['ab', 'a', '', 'bab']))
+        self.assertFalse(regex.match_stream(['ab', 'a']))
+        self.assertTrue(regex.match_stream(StringIO('ab' * 1000), 7))
+        self.assertFalse(regex.match_stream(StringIO('ab' * 1000 + 'a'), 7))
+
+class TestClosure(unittest.TestCase):
+    """test case : epsilon closures"""
+    def test_cycle(self):
+        """test closures on nested epsilon cycles"""
+        regex = yare.compile('((a|\\e)*|(b*)*)*c', dfa=False)
+        self.assertTrue(regex.__fa__.validate('abbac'))
+        self.assertFalse(regex.__fa__.validate('abbacc'))
+    def test_chain(self):
+        """test closures on a long chain of epsilon edges"""
+        from yare.fa import FA, EPSILON
+        fa = FA()
+        for node in xrange(10000):
+            fa.connect(node, node + 1, EPSILON)
+        fa.connect(10000, 0, EPSILON)
+        fa.connect(5000, 10001, 'a')
+        fa.set_start(0)
+        fa.add_final(10001)
+        self.assertEqual(len(fa.epsilon_closure(7000)), 10001)
+        self.assertTrue(fa.validate('a'))
+
+class TestGraph(unittest.TestCase):
+    """test case : state graphs"""
+    def test_large(self):
+        """test method `make_nfa` on a graph of 100k states"""
+        from yare.parser import build
+        graph = build('ab' * 25000)
+        nfa = graph.make_nfa()
+        self.assertEqual(nfa.size(), 100000)
+        self.assertEqual(nfa.__nodes__, set(xrange(100000)))
+        self.assertEqual(nfa.start_node(), 0)
+        self.assertEqual(len(graph.all_states()), 100000)
+        self.assertEqual(graph.make_nfa().map(), nfa.map())
+
+class TestBitNFA(unittest.TestCase):
+    """test case : bit-parallel position automaton"""
+    def test_agreement(self):
+        """test that it agrees with the NFA"""
+        import itertools
+        from yare.bitnfa import BitNFA
+        patterns = [ 'a|\\e', 'a*b|cd', '(ab|c)*d', '((a|b)*|c)*d',
+            '(a|b)*a(a|b)', 'a(b|c)*(cd|\\e)' ]
+        cases = [ ''.join(chars) for size in xrange(6)
+            for chars in itertools.product('abcdx', repeat=size) ]
+        for pattern in patterns:
+            nfa = yare.compile(pattern, dfa=False).__fa__
+            bits = BitNFA(nfa)
+            for case in cases:
+                self.assertEqual(bits.validate(case), nfa.validate(case))
+                self.assertEqual(bits.try_match(case), nfa.try_match(case))
+    def test_size(self):
+        """test that large NFAs are not simulated bit-parallel"""
+        from yare.bitnfa import BitNFA
+        regex = yare.compile(yare.select([ 'ab' + char
+            for char in 'abcdefghijklmnopqrstuvwxyz' * 6 ]), dfa=False)
+        self.assertFalse(isinstance(regex.__engine__, BitNFA))
+        self.assertTrue(BitNFA.positions(regex.fa()) > BitNFA.MAX_POSITIONS)
+        regex = yare.compile(yare.loop(yare.WILDCARD), dfa=False)
+        self.assertTrue(isinstance(regex.__engine__, BitNFA))
+
+class TestCodegen(unittest.TestCase):
+    """test case : DFA compiled to Python source"""
+    def test_agreement(self):
+        """test that it agrees with the table-driven DFA"""
+        import itertools
+        patterns = [ 'a|\\e', '\\e', 'a*b|cd', '((a|b)*|c)*d',
+            '(a|b)*a(a|b)', u'(\u00e9|b)*a' ]
+        cases = [ ''.join(chars) for size in xrange(6)
+            for chars in itertools.product('abcdx', repeat=size) ]
+        cases += [ u'\u00e9a', u'b\u00e9\u00e9a', u'\u00e8a' ]
+        for pattern in patterns:
+            dfa = yare.compile(pattern)
+            code = yare.compile(pattern, dfa='codegen')
+            for case in cases:
+                self.assertEqual(code.match(case), dfa.match(case))
+                self.assertEqual(code.match_prefix(case),
+                    dfa.match_prefix(case))
+                self.assertEqual(code.match(list(case)), dfa.match(case))
+            self.assertEqual(code.findall('xab'), dfa.findall('xab'))
+    def test_source(self):
+        """test method `source`"""
+        self.assertEqual(yare.compile('a*b').source(), None)
+        source = yare.compile('a*b', dfa='codegen').source()
+        self.assertTrue('def validate(classes):' in source)
+        self.assertTrue('def try_match(classes):' in source)
+
+class TestBytes(unittest.TestCase):
+    """test case : DFA over bytes"""
+    def test_inputs(self):
+        """test that bytes, bytearray, buffer and mmap agree"""
+        import mmap
+        regex = yare.compile('a*b|cd', bytes=True)
+        text = 'xxaab cd'
+        space = mmap.mmap(-1, len(text))
+        space.write(text)
+        for data in [ text, bytearray(text), buffer(text), space ]:
+            self.assertTrue(regex.match(data, 2, 5))
+            self.assertFalse(regex.match(data, 2))
+            self.assertEqual(regex.match_prefix(data, 2), 3)
+            self.assertEqual(regex.match_prefix(data, 6, 7), 0)
+        self.assertEqual(regex.search(text, 0, 4), None)
+        self.assertEqual(regex.search(text, 0, 5), (2, 5))
+        self.assertEqual(regex.findall(text), ['aab', 'cd'])
+        self.assertEqual(regex.findall(text, 3, 7), ['ab'])
+    def test_error(self):
+        """test the patterns which cannot be matched as bytes"""
+        self.assertRaises(ValueError, yare.compile, 'ab', False, True)
+        self.assertRaises(ValueError, yare.compile, u'\u0100', True, True)
+        regex = yare.compile('ab', bytes=True)
+        for method in [ regex.match, regex.match_prefix, regex.search,
+                        regex.findall ]:
+            self.assertRaises(TypeError, method, u'ab')
+            self.assertRaises(TypeError, method, u'abc')
+        for method in [ regex.match_many, regex.match_prefix_many ]:
+            self.assertRaises(TypeError, method, [ u'ab', u'b' ])
+            self.assertRaises(TypeError, method, [ 'ab', u'b' ])
+
+class TestPrefilter(unittest.TestCase):
+    """test case : required literals checked before the automata"""
+    def test_info(self):
+        """test the info of parsed patterns"""
+        from yare.parser import parse
+        info = parse('ERROR(a|b)*').info
+        self.assertEqual((info.prefix, info.suffix, info.required),
+            ('ERROR', '', 'ERROR'))
+        self.assertEqual(info.first, frozenset('E'))
+        info = parse('(a|b)*xyz(c|d)').info
+        self.assertEqual((info.prefix, info.suffix, info.required),
+            ('', '', 'xyz'))
+        self.assertFalse(info.nullable)
+        info = parse('ab|ac').info
+        self.assertEqual(info.exact, frozenset(['ab', 'ac']))
+        self.assertEqual(parse('(ab)*').info.nullable, True)
+    def test_types(self):
+        """test strings of another type than the literals"""
+        self.assertFalse(yare.compile(u'a*bc').match('a\xe9bc'))
+        self.assertEqual(yare.compile(u'a*bc').match_prefix('abc\xe9'), 3)
+        self.assertEqual(yare.compile(u'ab').search('\xe9ab'), (1, 3))
+        self.assertEqual(yare.compile(u'ab', dfa=False).findall('\xe9ab'),
+            ['ab'])
+        self.assertTrue(yare.compile('ab').match(u'ab'))
+    def test_shared(self):
+        """test that the infos of single characters are shared by type"""
+        import warnings
+        from yare import prefilter
+        from yare.prefilter import literal
+        # a warning already shown is not shown again, even as an error
+        vars(prefilter).pop('__warningregistry__', None)
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            self.assertEqual(literal(set('\xe9')).prefix, '\xe9')
+            self.assertEqual(literal(set(u'\xe9')).prefix, u'\xe9')
+            self.assertTrue(literal(set('a')) is literal(set('a')))
+            self.assertFalse(literal(set(u'\xe9')) is literal(set('\xe9')))
+            self.assertTrue(yare.compile('x\xe9').match('x\xe9'))
+            self.assertTrue(yare.compile(u'y\xe9').match(u'y\xe9'))
+    def test_agreement(self):
+        """test that it agrees with the engines alone"""
+        import itertools
+        from yare.regex import RegEx, build_nfa
+        cases = [ ''.join(chars) for size in xrange(6)
+            for chars in itertools.product('abcx', repeat=size) ]
+        for pattern in [ 'a(b|c)*', '(a|b)*cab*', 'ab|ac', 'a*|b', '\\e' ]:
+            regex = yare.compile(pattern)
+            plain = RegEx(build_nfa(pattern), pattern, True)
+            for case in cases:
+                self.assertEqual(regex.match(case), plain.match(case))
+                self.assertEqual(regex.match_prefix(case),
+                    plain.match_prefix(case))
+                self.assertEqual(regex.findall(case, 1),
+                    plain.findall(case, 1))
+    def test_stats(self):
+        """test the hit rate in the statistics"""
+        regex = yare.compile('ERROR(a|b)*', dfa='lazy')
+        self.assertEqual(regex.stats()['prefilter']['checks'], 0)
+        for line in [ 'ERRORab', 'WARNab', 'ERRORc', 'INFO' ]:
+            regex.match(line)
+        self.assertEqual(regex.search('xxERRORa'), (2, 8))
+        self.assertEqual(regex.search('xxERRa'), None)
+        counts = regex.stats()['prefilter']
+        self.assertEqual((counts['checks'], counts['rejects']), (6, 3))
+        self.assertEqual(counts['hit_rate'], 0.5)
+        self.assertFalse('prefilter' in yare.compile('(a|b)*').stats())
+
+class TestCompact(unittest.TestCase):
+    """test case : NFA stored as flat arrays"""
+    def test_agreement(self):
+        """test that it agrees with the NFA"""
+        import itertools
+        from yare.compact import CompactNFA
+        patterns = [ 'a|\\e', 'a*b|cd', '((a|\\e)*|(b*)*)*c',
+            'a(b|c)*(cd|\\e)' ]
+        cases = [ ''.join(chars) for size in xrange(6)
+            for chars in itertools.product('abcdx', repeat=size) ]
+        for pattern in patterns:
+            nfa = yare.compile(pattern, dfa=False).__fa__
+            compact = CompactNFA(nfa)
+            rebuilt = compact.to_fa()
+            self.assertEqual(compact.size(), nfa.size())
+            self.assertTrue(compact.memory() < nfa.memory())
+            for case in cases:
+                self.assertEqual(compact.validate(case), nfa.validate(case))
+                self.assertEqual(compact.try_match(case),
+                    nfa.try_match(case))
+                self.assertEqual(rebuilt.validate(case),
+                    nfa.validate(case))
+    def test_engine(self):
+        """test that large NFAs are kept compact"""
+        from yare.compact import CompactNFA
+        words = [ 'ab' + char + str(i) for i, char in
+                  enumerate('abcdefghijklmnopqrstuvwxyz' * 6) ]
+        regex = yare.compile(yare.select(words), dfa=False)
+        self.assertTrue(isinstance(regex.__engine__, CompactNFA))
+        self.assertTrue(regex.match('abc2'))
+        self.assertFalse(regex.match('abc3'))
+        self.assertEqual(regex.match_prefix('abz25x'), 5)
+
+class TestLazy(unittest.TestCase):
+    """test case : DFA built on demand"""
+    def test_cache(self):
+        """test that the state cache is bounded"""
+        from yare.lazy import LazyDFA
+        nfa = yare.compile('(a|b)*a(a|b)(a|b)(a|b)', dfa=False).__fa__
+        lazy = LazyDFA(nfa, max_states=4, thrash_ratio=0)
+        self.assertTrue(lazy.validate('abababbbaaab'))
+        self.assertFalse(lazy.validate('abababbbbaab'))
+        states, flushes, fallback = lazy.info()
+        self.assertTrue(states <= 4 and flushes > 0 and not fallback)
+        lazy = LazyDFA(nfa, max_states=4)
+        self.assertTrue(lazy.validate('abababbbaaab'))
+        self.assertTrue(lazy.info()[2])
+        self.assertTrue(lazy.validate('abababbbaaab'))
+        self.assertFalse(lazy.validate('abababbbbaab'))
+        self.assertEqual(lazy.try_match('abababbbaaabc'), 12)
+    def test_thrash(self):
+        """test that a fallback depends on the input, not on its chunks"""
+        from yare.lazy import LazyDFA
+        nfa = yare.compile('a*b*c*d*e*f*g*h*i*j*', dfa=False).__fa__
+        text = ''.join(char * 1000 for char in 'abcdefghij')
+        whole = LazyDFA(nfa, max_states=4)
+        self.assertTrue(whole.validate(text))
+        chunked = LazyDFA(nfa, max_states=4)
+        state = chunked.initial()
+        for i in xrange(0, len(text), 100):
+            state = chunked.feed(state, text[i:i + 100])[0]
+        self.assertTrue(chunked.accepts(state))
+        self.assertEqual(whole.info(), chunked.info())
+        self.assertFalse(whole.info()[2])
+        nfa = yare.compile('(a|b)*a(a|b)(a|b)(a|b)', dfa=False).__fa__
+        lazy = LazyDFA(nfa, max_states=4)
+        text = 'abbabaaabbbaabab' * 8
+        self.assertEqual(lazy.feed(lazy.initial(), text)[1],
+                         nfa.try_match(text))
+        self.assertTrue(lazy.info()[2])
+
+class TestRegexSet(unittest.TestCase):
+    """test case : several patterns matched together"""
+    def test_matches(self):
+        """test method `matches` against each pattern"""
+        import itertools
+        patterns = [ 'a*b', 'ab', '(a|b)*', 'c', '(a|b)*a(a|b)', 'a|\\e' ]
+        regex_set = yare.compile_set(patterns)
+        regexes = [ yare.compile(pattern) for pattern in patterns ]
+        for size in xrange(5):
+            for chars in itertools.product('abcx', repeat=size):
+                case = ''.join(chars)
+                expected = [ i for i, regex in enumerate(regexes)
+                             if regex.match(case) ]
+                self.assertEqual(regex_set.matches(case), expected)
+                self.assertEqual(regex_set.match(case), bool(expected))
+    def test_compile_set(self):
+        """test method `compile_set`"""
+        self.assertEqual(yare.compile_set([]).matches('a'), [])
+        self.assertRaises(SyntaxError, yare.compile_set, [ 'a', 'a(b' ])
+
+class TestLexer(unittest.TestCase):
+    """test case : maximal-munch lexer"""
+    def setUp(self):
+        """build a lexer"""
+        self.__lexer__ = yare.Lexer([
+            ('if', 'if'),
+            ('id', yare.loop_(yare.LOWERCASE)),
+            ('num', yare.loop_(yare.DIGIT)),
+            ('ws', yare.loop_(' ')),
+            ('op', yare.select(list('=+'))),
+            ('eq', '=='),
+        ])
+    def test_tokenize(self):
+        """test method `tokenize` on strings and chunks"""
+        expected = [ ('if', 'if', 0), ('ws', ' ', 2), ('id', 'ifx', 3),
+            ('ws', ' ', 6), ('eq', '==', 7), ('op', '=', 9),
+            ('num', '12', 10), ('op', '+', 12), ('id', 'x', 13) ]
+        self.assertEqual(list(self.__lexer__.tokenize('if ifx ===12+x')),
+            expected)
+        chunks = [ 'i', 'f', ' if', 'x =', '', '==1', '2+x' ]
+        self.assertEqual(list(self.__lexer__.tokenize(chunks)), expected)
+        self.assertEqual(list(self.__lexer__.tokenize('')), [])
+        lexer = yare.Lexer([ ('abc', 'abc'), ('a', 'a'), ('b', 'b') ])
+        self.assertEqual(list(lexer.tokenize([ 'a', 'b', 'a', 'b', 'c' ])),
+            [ ('a', 'a', 0), ('b', 'b', 1), ('abc', 'abc', 2) ])
+        self.assertEqual(list(lexer.tokenize([ 'ab', 'cab', 'b' ])),
+            [ ('abc', 'abc', 0), ('a', 'a', 3), ('b', 'b', 4),
+              ('b', 'b', 5) ])
+    def test_error(self):
+        """test that input matched by no rule raises ValueError"""
+        tokens = self.__lexer__.tokenize('ab ?')
+        self.assertEqual(next(tokens), ('id', 'ab', 0))
+        self.assertEqual(next(tokens), ('ws', ' ', 2))
+        self.assertRaises(ValueError, next, tokens)
+
+class TestStore(unittest.TestCase):
+    """test case : compiled DFAs on disk"""
+    def setUp(self):
+        """make a temporary directory"""
+        import tempfile
+        self.__directory__ = tempfile.mkdtemp()
+    def tearDown(self):
+        """remove the temporary directory"""
+        import shutil
+        yare.set_store_dir(None)
+        yare.purge()
+        shutil.rmtree(self.__directory__)
+    def test_save(self):
+        """test methods `save` and `load`"""
+        import os
+        from yare.prefilter import Info
+        path = os.path.join(self.__directory__, 'regex.yare')
+        for pattern in [ 'a*(b|c)d', u'(\u00e9|b)*a', 'a|\\e', '\\e' ]:
+            regex = yare.compile(pattern)
+            regex.save(path)
+            loaded = yare.load(path)
+            self.assertEqual(loaded.pattern(), pattern)
+            self.assertEqual(loaded.__prefilter__ is None,
+                regex.__prefilter__ is None)
+            for name in Info.__slots__:
+                self.assertEqual(getattr(loaded.info(), name, None),
+                    getattr(regex.info(), name, None))
+            table = loaded.table()
+            self.assertFalse(isinstance(table.__transitions__, list))
+            self.assertEqual(table.lengths(), regex.table().lengths())
+            self.assertEqual(table.__sink__, regex.table().__sink__)
+            for case in [ '', 'a', 'bd', 'aacd', 'ad', u'\u00e9ba', 'xa' ]:
+                self.assertEqual(loaded.match(case), regex.match(case))
+                self.assertEqual(loaded.findall(case), regex.findall(case))
+        with open(path, 'wb') as out:
+            out.write('not a regex')
+        self.assertRaises(ValueError, yare.load, path)
+    def test_truncated(self):
+        """test that truncated files are rejected, and missed by the store"""
+        import os
+        from yare import store
+        data = store.dump(yare.compile('a*(b|c)d').table(), 'a*(b|c)d')
+        for size in [ store.HEADER.size, len(data) // 2, len(data) - 1 ]:
+            self.assertRaises(ValueError, store.loads, data[:size])
+        yare.set_store_dir(self.__directory__)
+        yare.purge()
+        path = yare.regex.__store__.path('a*b')
+        with open(path, 'wb') as out:
+            out.write(store.dump(yare.compile('a*b').table(), 'a*b')[:-1])
+        yare.purge()
+        self.assertTrue(yare.compile('a*b').match('aab'))
+        self.assertEqual(len(os.listdir(self.__directory__)), 1)
+    def test_store_dir(self):
+        """test method `set_store_dir`"""
+        import os
+        yare.set_store_dir(self.__directory__)
+        yare.purge()
+        self.assertFalse(yare.compile('a*b').__fa__ is None)
+        self.assertEqual(len(os.listdir(self.__directory__)), 1)
+        yare.purge()
+        regex = yare.compile('a*b')
+        self.assertTrue(regex.__fa__ is None)
+        self.assertTrue(regex.match('aab'))
+        self.assertFalse(regex.__prefilter__ is None)
+        self.assertFalse('parse' in regex.stats()['times'])
+        self.assertFalse(yare.compile('a*b', dfa=False).__fa__ is None)
+
+class TestScan(unittest.TestCase):
+    """test case : corpus scan"""
+    def setUp(self):
+        """write a corpus to a temporary directory"""
+        import os
+        import tempfile
+        self.__directory__ = tempfile.mkdtemp()
+        self.__lines__ = [ 'ab', '', 'aab', 'cab', 'b', 'abab', 'ba' ] * 20
+        for name in [ 'a.txt', 'b.txt' ]:
+            with open(os.path.join(self.__directory__, name), 'wb') as out:
+                out.write('\n'.join(self.__lines__))
+    def tearDown(self):
+        """remove the temporary directory"""
+        import shutil
+        shutil.rmtree(self.__directory__)
+    def expected(self, path, match):
+        """return the expected result of scanning the file at `path`"""
+        result = []
+        offset = 0
+        for line in self.__lines__:
+            if match(line):
+                result.append((path, offset))
+            offset += len(line) + 1
+        return result
+    def test_files(self):
+        """test function `scan` over files"""
+        import os
+        path = os.path.join(self.__directory__, 'a.txt')
+        regex = yare.compile('a*b')
+        expected = self.expected(path, regex.match)
+        for workers in [ 1, 2 ]:
+            self.assertEqual(list(yare.scan(path, regex, workers=workers,
+                                            size=10)), expected)
+        expected += self.expected(path.replace('a.txt', 'b.txt'), regex.match)
+        self.assertEqual(list(yare.scan(self.__directory__, 'a*b',
+                                        workers=2, size=16)), expected)
+        self.assertEqual(list(yare.scan(path, 'ba', workers=2, size=16,
+                                        search=True)),
+                         self.expected(path, lambda line: 'ba' in line))
+    def test_lines(self):
+        """test function `scan` over an iterable of lines"""
+        regex = yare.compile('a*b')
+        expected = [ (None, i) for i, line in enumerate(self.__lines__)
+                     if regex.match(line) ]
+        lines = iter([ line + '\n' for line in self.__lines__ ])
+        self.assertEqual(list(yare.scan(lines, regex, workers=2, batch=9)),
+                         expected)
+
+class TestStats(unittest.TestCase):
+    """test case : compilation statistics"""
+    def tearDown(self):
+        """remove the hook"""
+        yare.set_stats_hook(None)
+    def test_stats(self):
+        """test method `stats`"""
+        stats = yare.compile('(a|b)*a(a|b)').stats()
+        self.assertEqual(stats['pattern'], '(a|b)*a(a|b)')
+        self.assertEqual(sorted(stats['times']), [ 'make_dfa', 'make_nfa',
+            'minimize', 'parse', 'relabel', 'table' ])
+        self.assertEqual(stats['minimal']['states'], 4)
+        self.assertEqual(stats['table']['states'], 5)
+        self.assertTrue(stats['dfa']['states'] >= 4)
+        self.assertTrue(stats['nfa']['edges'] > 0)
+        self.assertTrue(stats['nfa']['memory'] > 0)
+        stats = yare.compile('a*', dfa=False).stats()
+        self.assertEqual(sorted(stats['times']), [ 'make_nfa', 'parse' ])
+    def test_hook(self):
+        """test function `set_stats_hook`"""
+        reported = []
+        yare.set_stats_hook(reported.append)
+        yare.purge()
+        regex = yare.compile('a*b')
+        yare.compile('a*b')
+        self.assertEqual(reported, [ regex.stats() ])
+
+class TestCache(unittest.TestCase):
+    """test case : compile cache"""
+    def tearDown(self):
+        """restore the default cache"""
+        yare.set_cache_size(128)
+        yare.purge()
+    def test_hit(self):
+        """test that repeated compiles are served from the cache"""
+        yare.purge()
+        regex = yare.compile('a*b')
+        self.assertTrue(yare.compile('a*b') is regex)
+        self.assertFalse(yare.compile('a*b', dfa=False) is regex)
+        info = yare.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 2, 2))
+    def test_eviction(self):
+        """test that the least recently used pattern is evicted"""
+        yare.purge()
+        yare.set_cache_size(2)
+        first = yare.compile('a')
+        yare.compile('b')
+        yare.compile('a')
+        yare.compile('c')
+        self.assertTrue(yare.compile('a') is first)
+        self.assertEqual(yare.cache_info().currsize, 2)
+        yare.set_cache_size(0)
+        self.assertFalse(yare.compile('a') is yare.compile('a'))
+
 class TestException(unittest.TestCase):
     """test case : exception"""
     def test_compile(self):
@@ -3,8 +3,11 @@
 
 """init file of the package"""
 
-from .regex import compile, match
+from .regex import compile, compile_set, match, search, findall, \
+    cache_info, purge, set_cache_size, load, set_store_dir, set_stats_hook
+from .lexer import Lexer
+from .corpus import scan
 from .utils import escape, group, select, concat, loop, \
-    loop_, diff, optional, range
+    loop_, repeat, diff, optional, range
 from .definitions import EPSILON, DIGIT, LOWERCASE, UPPERCASE, \
     WHITESPACE, PUNCTUATION, WILDCARD
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# coding:utf-8
+
+"""static analysis of compiled DFAs"""
+
+def successors(width, transitions):
+    """
+    return the set of the rows every row of a transition table goes to,
+    see `Table`
+    """
+    return [ { transitions[state + cls] // width for cls in xrange(width) }
+             for state in xrange(0, len(transitions), width) ]
+
+def predecessors(succ):
+    """return the rows every row is reached from, given `successors`"""
+    pred = [ [] for _ in succ ]
+    for row, targets in enumerate(succ):
+        for target in targets:
+            pred[target].append(row)
+    return pred
+
+def live_rows(pred, finals):
+    """return the set of the rows from which a final row is reachable"""
+    live = set(finals)
+    stack = list(live)
+    while stack:
+        for row in pred[stack.pop()]:
+            if row not in live:
+                live.add(row)
+                stack.append(row)
+    return live
+
+def accept_sinks(succ, pred, finals):
+    """
+    return the set of the final rows from which only final rows are
+    reachable, whatever the input: once in one, every prefix of the rest
+    of the input is accepted
+    """
+    sinks = set(finals)
+    stack = [ row for row in sinks if not succ[row] <= sinks ]
+    while stack:
+        row = stack.pop()
+        if row in sinks:
+            sinks.remove(row)
+            stack.extend(pred[row])
+    return sinks
+
+def lengths(succ, start, finals, live):
+    """
+    return the minimum and the maximum length of the strings accepted
+    from row `start` through `live` rows, the latter None if there is no
+    bound; `(0, 0)` if no string is accepted
+    """
+    if start not in live:
+        return 0, 0
+    finals = set(finals)
+    # breadth-first for the minimum
+    depth = 0
+    level = [ start ]
+    seen = { start }
+    shortest = None
+    while level and shortest is None:
+        if any(row in finals for row in level):
+            shortest = depth
+            break
+        next_level = []
+        for row in level:
+            for target in succ[row]:
+                if target in live and target not in seen:
+                    seen.add(target)
+                    next_level.append(target)
+        level = next_level
+        depth += 1
+    # depth-first for the maximum, which is None on any cycle
+    longest = {}
+    on_path = set()
+    stack = [ (start, iter(succ[start] & live)) ]
+    on_path.add(start)
+    while stack:
+        row, targets = stack[-1]
+        for target in targets:
+            if target in on_path:
+                return shortest, None
+            if target not in longest:
+                on_path.add(target)
+                stack.append((target, iter(succ[target] & live)))
+                break
+        else:
+            stack.pop()
+            on_path.remove(row)
+            best = 0 if row in finals else None
+            for target in succ[row] & live:
+                if longest[target] is not None and \
+                        (best is None or longest[target] + 1 > best):
+                    best = longest[target] + 1
+            longest[row] = best
+    return shortest, longest[start]
+
+def analyze(width, transitions, start, finals):
+    """
+    return the analysis of a transition table, see `Table`, as the order
+    of the rows to put the dead ones last and the accept-sinks just
+    before them, the set of the dead rows, the set of the accept-sinks,
+    and the `lengths` of the accepted strings
+
+    `start` and `finals` are rows, not premultiplied states
+    """
+    succ = successors(width, transitions)
+    pred = predecessors(succ)
+    live = live_rows(pred, finals)
+    sinks = accept_sinks(succ, pred, finals)
+    rows = xrange(len(succ))
+    order = [ row for row in rows if row in live and row not in sinks ]
+    order.extend(row for row in rows if row in sinks)
+    order.extend(row for row in rows if row not in live)
+    dead = set(rows) - live
+    return order, dead, sinks, lengths(succ, start, finals, live)
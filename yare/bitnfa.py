@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# coding:utf-8
+
+"""bit-parallel simulation of the position (Glushkov) automaton"""
+
+from itertools import imap
+from fa import EPSILON
+
+CHUNK = 8
+
+class BitNFA:
+    """
+    position automaton of a Thompson NFA, simulated with its set of
+    active positions as the bits of an int
+
+    position 0 is the initial one, and every other position is the
+    target of an edge labeled with characters; since the NFA is built by
+    Thompson's construction, every such target has exactly one incoming
+    labeled edge, so a position is entered by exactly one character set
+
+    one step is `follow(active) & masks[char]`, where `follow` is looked
+    up `CHUNK` bits at a time in precomputed tables
+    """
+    MAX_POSITIONS = 256
+
+    def __init__(self, nfa):
+        fa_map = nfa.map()
+        labels = {}
+        for src in fa_map:
+            for label, dsts in fa_map[src].iteritems():
+                if label == EPSILON:
+                    continue
+                for dst in dsts:
+                    labels.setdefault(dst, set()).update(label)
+        nodes = [ nfa.start_node() ] + sorted(labels)
+        bit = dict(zip(nodes[1:], [ 1 << i for i in xrange(1, len(nodes)) ]))
+        # a position enters the positions reachable via one labeled edge
+        # from its epsilon closure
+        follow = []
+        self.__finals__ = 0
+        for i, node in enumerate(nodes):
+            mask = 0
+            for closed in nfa.epsilon_closure(node):
+                for label, dsts in fa_map.get(closed, {}).iteritems():
+                    if label != EPSILON:
+                        for dst in dsts:
+                            mask |= bit[dst]
+            follow.append(mask)
+            if nfa.accepts(nfa.epsilon_closure(node)):
+                self.__finals__ |= 1 << i
+        self.__masks__ = {}
+        for node in nodes[1:]:
+            for char in labels[node]:
+                self.__masks__[char] = self.__masks__.get(char, 0) | bit[node]
+        self.__tables__ = []
+        for shift in xrange(0, len(nodes), CHUNK):
+            chunk = follow[shift:shift + CHUNK]
+            table = [0] * (1 << len(chunk))
+            for byte in xrange(1, len(table)):
+                low = byte & -byte
+                table[byte] = table[byte ^ low] | chunk[low.bit_length() - 1]
+            self.__tables__.append((shift, (1 << len(chunk)) - 1, table))
+        self.__size__ = len(nodes)
+
+    @staticmethod
+    def positions(nfa):
+        """
+        return the number of positions of the position automaton of
+        `nfa`, including the initial one, without building it
+        """
+        fa_map = nfa.map()
+        targets = set()
+        for src in fa_map:
+            for label, dsts in fa_map[src].iteritems():
+                if label != EPSILON:
+                    targets.update(dsts)
+        return len(targets) + 1
+
+    def size(self):
+        """getter: number of positions, including the initial one"""
+        return self.__size__
+
+    def initial(self):
+        """getter: start state, i.e., only the initial position"""
+        return 1
+
+    def accepts(self, state):
+        """whether any position in `state` is final"""
+        return bool(state & self.__finals__)
+
+    @staticmethod
+    def is_dead(state):
+        """whether no position is active"""
+        return not state
+
+    def feed(self, state, edges):
+        """
+        run the automaton over `edges` from `state`, stopping when no
+        position is active
+
+        return the state reached and the maximum index that leads to a
+        final state, if there is no such index, the latter is -1
+        """
+        tables = self.__tables__
+        masks = self.__masks__
+        finals = self.__finals__
+        last = -1
+        for i, edge in enumerate(edges):
+            follow = 0
+            for shift, chunk, table in tables:
+                follow |= table[(state >> shift) & chunk]
+            state = follow & masks.get(edge, 0)
+            if not state:
+                break
+            if state & finals:
+                last = i+1
+        return state, last
+
+    def validate(self, edges):
+        """
+        validate if a string can be accepted by the automaton
+
+        return True if any final position is active at the end
+        """
+        return self.accepts(self.feed(1, edges)[0])
+
+    def try_match(self, edges):
+        """
+        try to match string as long as possible
+
+        return the maximum index that makes self.validate(edges[:index])
+        True, if there is no such index, return 0
+        """
+        return max(self.feed(1, edges)[1], 0)
+
+    def longest(self, edges, pos=0, end=None):
+        """
+        return the maximum index that makes
+        self.validate(edges[pos:index]) True, for index up to `end`, the
+        end of `edges` by default; if there is no such index, return -1
+        """
+        if end is None:
+            end = len(edges)
+        last = self.feed(1, imap(edges.__getitem__, xrange(pos, end)))[1]
+        if last >= 0:
+            return pos + last
+        return pos if self.__finals__ & 1 else -1
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# coding:utf-8
+
+"""caches of compiled regular expressions"""
+
+import threading
+from collections import OrderedDict, namedtuple
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+class LRUCache:
+    """
+    a bounded, thread-safe cache which evicts the least recently used
+    entry when it is full
+
+    `maxsize` of 0 disables caching
+    """
+    def __init__(self, maxsize=128):
+        if maxsize < 0:
+            raise ValueError('cache size must be non-negative, but get `%s`'
+                % maxsize)
+        self.__maxsize__ = maxsize
+        self.__entries__ = OrderedDict()
+        self.__lock__ = threading.Lock()
+        self.__hits__ = 0
+        self.__misses__ = 0
+
+    def get(self, key):
+        """return the cached value of `key`, or None if it is absent"""
+        with self.__lock__:
+            if key in self.__entries__:
+                value = self.__entries__.pop(key)
+                self.__entries__[key] = value
+                self.__hits__ += 1
+                return value
+            self.__misses__ += 1
+            return None
+
+    def put(self, key, value):
+        """cache `value` under `key`, evicting old entries if necessary"""
+        with self.__lock__:
+            if not self.__maxsize__:
+                return value
+            self.__entries__.pop(key, None)
+            self.__entries__[key] = value
+            while len(self.__entries__) > self.__maxsize__:
+                self.__entries__.popitem(last=False)
+            return value
+
+    def info(self):
+        """return the statistics of the cache as a `CacheInfo`"""
+        with self.__lock__:
+            return CacheInfo(self.__hits__, self.__misses__,
+                self.__maxsize__, len(self.__entries__))
+
+    def purge(self):
+        """remove all the entries and reset the statistics"""
+        with self.__lock__:
+            self.__entries__.clear()
+            self.__hits__ = 0
+            self.__misses__ = 0
+
+    def resize(self, maxsize):
+        """change the maximum size, evicting old entries if necessary"""
+        if maxsize < 0:
+            raise ValueError('cache size must be non-negative, but get `%s`'
+                % maxsize)
+        with self.__lock__:
+            self.__maxsize__ = maxsize
+            while len(self.__entries__) > maxsize:
+                self.__entries__.popitem(last=False)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# coding:utf-8
+
+"""DFA compiled to specialized Python source"""
+
+from table import Table
+
+MAX_STATES = 256
+
+def __state__(table, state, matching):
+    """return the lines of the branch of `state`, see `generate`"""
+    width = table.__width__
+    trans = table.__transitions__
+    finals = table.__finals__
+    targets = {}
+    for cls in xrange(width):
+        target = trans[state + cls]
+        if target != table.__dead__:
+            targets.setdefault(target, []).append(chr(cls))
+    lines = [ 'for %s in it:' % ('i, c' if matching else 'c') ]
+    # the loop on the state first, then the most likely targets
+    order = sorted(targets, key=lambda target:
+        (target != state, -len(targets[target]), target))
+    for target in order:
+        chars = ''.join(targets[target])
+        if len(chars) == 1:
+            lines.append('    if c == %r:' % chars)
+        else:
+            lines.append('    if c in %r:' % chars)
+        if matching and target in finals:
+            lines.append('        last = i')
+        if target == state:
+            lines.append('        continue')
+        else:
+            lines.append('        state = %d' % (target // width))
+            lines.append('        break')
+    lines.append('    return %s' % ('last' if matching else 'False'))
+    lines.append('else:')
+    lines.append('    return %s' % ('last' if matching else state in finals))
+    return lines
+
+def __dispatch__(table, low, high, matching):
+    """
+    return the lines which run the branch of the state between `low`
+    and `high`, by bisection
+    """
+    if high - low == 1:
+        return __state__(table, low * table.__width__, matching)
+    middle = (low + high) // 2
+    lines = [ 'if state < %d:' % middle ]
+    lines.extend('    ' + line
+                 for line in __dispatch__(table, low, middle, matching))
+    lines.append('else:')
+    lines.extend('    ' + line
+                 for line in __dispatch__(table, middle, high, matching))
+    return lines
+
+def generate(table):
+    """
+    return the Python source of the functions `validate` and `try_match`
+    of `table`, which take the string of the classes of the characters
+    rather than the characters themselves
+
+    every state is a branch running a loop of its own, which consumes
+    characters as long as they loop on the state, and is left only to
+    go to another state, whose branch is found by bisection; the dead
+    state is never entered, the functions return as soon as it would be
+    """
+    width = table.__width__
+    lines = []
+    for name in [ 'validate', 'try_match' ]:
+        matching = name == 'try_match'
+        lines.append('def %s(classes):' % name)
+        if matching:
+            lines.append('    it = enumerate(classes, 1)')
+            lines.append('    last = 0')
+        else:
+            lines.append('    it = iter(classes)')
+        lines.append('    state = %d' % (table.__start__ // width))
+        lines.append('    while True:')
+        lines.extend('        ' + line for line in
+                     __dispatch__(table, 0, table.__dead__ // width, matching))
+        lines.append('')
+    return '\n'.join(lines)
+
+class CodeTable(Table):
+    """
+    compiled DFA whose `validate` and `try_match` are Python functions
+    generated for it, see `generate`
+
+    a string is first mapped to the string of its classes with
+    `str.translate`, a unicode one with `unicode.translate` and a
+    mapping which sends unknown characters to class 0; other iterables
+    of characters, and tables of more than `MAX_STATES` states or 256
+    classes, use the generic loops of `Table`
+    """
+    def __init__(self, fa):
+        Table.__init__(self, fa)
+        self.__source__ = None
+        self.__functions__ = None
+        if self.__width__ > 256 or self.size() > MAX_STATES:
+            return
+        classes = self.__classes__
+        codes = [ chr(0) ] * 256
+        for char, cls in classes.iteritems():
+            if isinstance(char, str) or ord(char) < 128:
+                codes[ord(char)] = chr(cls)
+        self.__bytes__ = ''.join(codes)
+        self.__unicode__ = ClassMap(
+            (ord(char), unichr(cls)) for char, cls in classes.iteritems()
+            if isinstance(char, unicode) or ord(char) < 128
+        )
+        self.__source__ = generate(self)
+        namespace = {}
+        exec compile(self.__source__, '<yare>', 'exec') in namespace
+        self.__functions__ = (namespace['validate'], namespace['try_match'])
+
+    def source(self):
+        """getter: generated source, None if the table is not generated"""
+        return self.__source__
+
+    def __translate__(self, edges):
+        """return the string of the classes of `edges`, or None"""
+        if self.__functions__ is None:
+            return None
+        if isinstance(edges, str):
+            return edges.translate(self.__bytes__)
+        if isinstance(edges, unicode):
+            return edges.translate(self.__unicode__).encode('latin-1')
+        return None
+
+    def validate(self, edges):
+        """
+        validate if a string can be accepted by the DFA
+
+        return True if the string ends in a final state, otherwise False
+        """
+        classes = self.__translate__(edges)
+        if classes is None:
+            return Table.validate(self, edges)
+        return self.__functions__[0](classes)
+
+    def try_match(self, edges):
+        """
+        try to match string as long as possible
+
+        return the maximum index that makes self.validate(edges[:index])
+        True, if there is no such index, return 0
+        """
+        classes = self.__translate__(edges)
+        if classes is None:
+            return Table.try_match(self, edges)
+        return self.__functions__[1](classes)
+
+class ClassMap(dict):
+    """`unicode.translate` mapping of code points to class characters"""
+    def __missing__(self, key):
+        return u'\0'
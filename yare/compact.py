@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# coding:utf-8
+
+"""Nondeterministic Finite Automata stored as flat arrays"""
+
+from array import array
+from itertools import imap
+from sys import getsizeof
+
+from fa import EPSILON
+
+class CompactNFA(object):
+    """
+    NFA whose edges are stored in compressed sparse row form
+
+    nodes are renumbered densely; the labeled edges of node `n` are
+    `targets[offsets[n]:offsets[n+1]]`, labeled `labels[kinds[i]]`
+    (distinct labels are stored once), and its epsilon edges are
+    `epsilon_targets[epsilon_offsets[n]:epsilon_offsets[n+1]]`
+
+    epsilon closures are computed when needed rather than cached, which
+    keeps the memory linear in the size of the NFA
+    """
+    __slots__ = ('__offsets__', '__kinds__', '__labels__', '__targets__',
+                 '__epsilon_offsets__', '__epsilon_targets__', '__start__',
+                 '__finals__')
+
+    def __init__(self, fa):
+        nodes = sorted(fa.__nodes__ | {fa.start_node()})
+        index = dict(zip(nodes, xrange(len(nodes))))
+        fa_map = fa.map()
+        labels = {}
+        self.__offsets__ = array('i', [0])
+        self.__kinds__ = array('i')
+        self.__targets__ = array('i')
+        self.__epsilon_offsets__ = array('i', [0])
+        self.__epsilon_targets__ = array('i')
+        for node in nodes:
+            for label, dsts in fa_map.get(node, {}).iteritems():
+                if label == EPSILON:
+                    self.__epsilon_targets__.extend(index[dst] for dst in dsts)
+                    continue
+                kind = labels.setdefault(label, len(labels))
+                for dst in dsts:
+                    self.__kinds__.append(kind)
+                    self.__targets__.append(index[dst])
+            self.__offsets__.append(len(self.__targets__))
+            self.__epsilon_offsets__.append(len(self.__epsilon_targets__))
+        self.__labels__ = [ None ] * len(labels)
+        for label, kind in labels.iteritems():
+            self.__labels__[kind] = label
+        self.__start__ = index[fa.start_node()]
+        self.__finals__ = frozenset(index[node] for node in fa.final_nodes())
+
+    def size(self):
+        """getter: number of nodes"""
+        return len(self.__offsets__) - 1
+
+    def edge_count(self):
+        """getter: number of edges, epsilon edges included"""
+        return len(self.__targets__) + len(self.__epsilon_targets__)
+
+    def memory(self):
+        """
+        return an estimate of the bytes taken by the arrays, labels being
+        shared with the FA and not counted
+        """
+        return sum(getsizeof(getattr(self, name)) for name in
+                   [ '__offsets__', '__kinds__', '__labels__', '__targets__',
+                     '__epsilon_offsets__', '__epsilon_targets__',
+                     '__finals__' ])
+
+    def to_fa(self):
+        """return the NFA as a FA"""
+        from fa import FA
+        fa = FA()
+        offsets = self.__offsets__
+        epsilon_offsets = self.__epsilon_offsets__
+        for node in xrange(self.size()):
+            for i in xrange(offsets[node], offsets[node + 1]):
+                fa.connect(node, self.__targets__[i],
+                    self.__labels__[self.__kinds__[i]])
+            for i in xrange(epsilon_offsets[node], epsilon_offsets[node + 1]):
+                fa.connect(node, self.__epsilon_targets__[i], EPSILON)
+        fa.__nodes__.update(xrange(self.size()))
+        fa.__start__ = self.__start__
+        for node in self.__finals__:
+            fa.add_final(node)
+        return fa
+
+    def epsilon_closure(self, nodes):
+        """
+        return the nodes reachable from any node of `nodes` via epsilon
+        edges, `nodes` included, as a frozenset
+        """
+        offsets = self.__epsilon_offsets__
+        targets = self.__epsilon_targets__
+        closure = set(nodes)
+        stack = list(closure)
+        while stack:
+            node = stack.pop()
+            for i in xrange(offsets[node], offsets[node + 1]):
+                target = targets[i]
+                if target not in closure:
+                    closure.add(target)
+                    stack.append(target)
+        return frozenset(closure)
+
+    def move(self, nodes, char):
+        """
+        return the epsilon closure of the nodes reachable from any of the
+        node in `nodes` via an edge accepting `char`
+        """
+        offsets = self.__offsets__
+        kinds = self.__kinds__
+        labels = self.__labels__
+        targets = self.__targets__
+        result = []
+        for node in nodes:
+            for i in xrange(offsets[node], offsets[node + 1]):
+                if char in labels[kinds[i]]:
+                    result.append(targets[i])
+        return self.epsilon_closure(result)
+
+    def initial(self):
+        """return the set of nodes the NFA is in before any input"""
+        return self.epsilon_closure([ self.__start__ ])
+
+    def accepts(self, nodes):
+        """whether any node in `nodes` is a final node"""
+        return not self.__finals__.isdisjoint(nodes)
+
+    @staticmethod
+    def is_dead(nodes):
+        """whether no string can be accepted from `nodes`"""
+        return not nodes
+
+    def feed(self, nodes, edges):
+        """
+        run the NFA over `edges` from the set of nodes `nodes`
+
+        return the set of nodes reached and the maximum index that leads
+        to a final node, if there is no such index, the latter is -1
+        """
+        last = -1
+        for i, edge in enumerate(edges):
+            nodes = self.move(nodes, edge)
+            if not nodes:
+                break
+            if self.accepts(nodes):
+                last = i+1
+        return nodes, last
+
+    def validate(self, edges):
+        """
+        validate if a string can be accepted by the NFA
+
+        return True if any final node is reachable, otherwise False
+        """
+        return self.accepts(self.feed(self.initial(), edges)[0])
+
+    def try_match(self, edges):
+        """
+        try to match string as long as possible
+
+        return the maximum index that makes self.validate(edges[:index])
+        True, if there is no such index, return 0
+        """
+        return max(self.feed(self.initial(), edges)[1], 0)
+
+    def longest(self, edges, pos=0, end=None):
+        """
+        return the maximum index that makes
+        self.validate(edges[pos:index]) True, for index up to `end`, the
+        end of `edges` by default; if there is no such index, return -1
+        """
+        if end is None:
+            end = len(edges)
+        start = self.initial()
+        last = self.feed(start, imap(edges.__getitem__, xrange(pos, end)))[1]
+        if last >= 0:
+            return pos + last
+        return pos if self.accepts(start) else -1
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# coding:utf-8
+
+"""scan of large line-oriented corpora with a pool of processes"""
+
+import os
+from collections import deque
+from itertools import islice, izip
+from multiprocessing import Pool, cpu_count
+
+from regex import RegEx, compile
+import store
+
+RANGE_SIZE = 1 << 24
+BATCH_SIZE = 1 << 14
+
+__worker__ = None
+
+def __init_worker__(data, search):
+    """pool initializer: rebuild the regex from its compiled DFA file"""
+    global __worker__
+    pattern, table, info = store.loads(data)
+    __worker__ = (RegEx(None, pattern, True, table, info=info), search)
+
+def __work__(task, worker=None):
+    """
+    return the offsets of the matching lines of `task`, which is either
+    a byte range `(path, begin, end)` of a file or `(None, first, lines)`
+    """
+    regex, search = worker or __worker__
+    path, begin, lines = task
+    if path is not None:
+        with open(path, 'rb') as source:
+            source.seek(begin)
+            data = source.read(lines - begin)
+        lines = data.split(b'\n')
+        if data.endswith(b'\n'):
+            lines.pop()
+        step = lambda line: len(line) + 1
+    else:
+        lines = [ line.rstrip('\n') for line in lines ]
+        step = lambda line: 1
+    if search:
+        matched = [ regex.search(line) is not None for line in lines ]
+    else:
+        matched = regex.match_many(lines)
+    offsets = []
+    offset = begin
+    for line, hit in izip(lines, matched):
+        if hit:
+            offsets.append(offset)
+        offset += step(line)
+    return offsets
+
+def __files__(paths):
+    """yield the files of `paths`, walking directories in sorted order"""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                yield os.path.join(root, name)
+
+def __ranges__(path, size):
+    """
+    yield the tasks of the file at `path`: byte ranges of about `size`
+    bytes, ending right after a newline or at the end of the file
+    """
+    total = os.path.getsize(path)
+    begin = 0
+    with open(path, 'rb') as source:
+        while begin < total:
+            end = begin + size
+            if end < total:
+                source.seek(end - 1)
+                source.readline()
+                end = source.tell()
+            else:
+                end = total
+            yield (path, begin, end)
+            begin = end
+
+def __tasks__(source, size, batch):
+    """yield the tasks of `source`, see `scan`"""
+    if isinstance(source, basestring):
+        source = [ source ]
+    if isinstance(source, (list, tuple)):
+        for path in __files__(source):
+            for task in __ranges__(path, size):
+                yield task
+        return
+    source = iter(source)
+    first = 0
+    while True:
+        lines = list(islice(source, batch))
+        if not lines:
+            return
+        yield (None, first, lines)
+        first += len(lines)
+
+def scan(source, regex, workers=None, search=False,
+         size=RANGE_SIZE, batch=BATCH_SIZE):
+    """
+    yield `(path, offset)` for every line of `source` which matches
+    `regex`, a RegEx or a pattern, in order
+
+    `source` is a path or a list of paths, directories being walked, in
+    which case `offset` is the byte offset of the line in its file; or
+    any other iterable of lines, in which case `path` is None and
+    `offset` is the index of the line; lines are split on (and exclude)
+    `\\n`
+
+    with `search`, a line matches if any substring of it matches
+
+    files are split into line-aligned ranges of about `size` bytes, and
+    iterables into batches of `batch` lines, which are matched by a pool
+    of `workers` processes, as many as CPUs by default; the compiled DFA
+    is sent to every process once, when the pool starts
+    """
+    if isinstance(regex, basestring):
+        regex = compile(regex)
+    table = regex.table()
+    worker = (RegEx(None, regex.pattern(), True, table, info=regex.info()),
+              search)
+    tasks = __tasks__(source, size, batch)
+    if workers is None:
+        workers = cpu_count()
+    if workers <= 1:
+        for task in tasks:
+            for offset in __work__(task, worker):
+                yield (task[0], offset)
+        return
+    pool = Pool(workers, __init_worker__,
+                (store.dump(table, regex.pattern(), regex.info()), search))
+    try:
+        pending = deque()
+        for task in tasks:
+            pending.append((task[0], pool.apply_async(__work__, (task,))))
+            if len(pending) >= 2 * workers:
+                path, result = pending.popleft()
+                for offset in result.get():
+                    yield (path, offset)
+        while pending:
+            path, result = pending.popleft()
+            for offset in result.get():
+                yield (path, offset)
+    finally:
+        pool.terminate()
+        pool.join()
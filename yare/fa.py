@@ -5,11 +5,29 @@
 
 EPSILON = r'\0'
 
+def partition_alphabet(labels):
+    """
+    split the characters of `labels` into disjoint classes, such that
+    each label is the union of some of the classes
+
+    two characters are in the same class iff they appear in exactly the
+    same labels
+    """
+    signatures = {}
+    for i, label in enumerate(labels):
+        for char in label:
+            signatures.setdefault(char, []).append(i)
+    classes = {}
+    for char in signatures:
+        classes.setdefault(tuple(signatures[char]), set()).add(char)
+    return [ frozenset(chars) for chars in classes.values() ]
+
 class FA:
     """
     Finite Automata
 
-    EPSILON indicates epsilon
+    EPSILON indicates epsilon, every other edge is labeled with a
+    frozenset of characters and accepts any one of them
     """
     def __init__(self):
         self.__acceptable__ = set()
@@ -17,6 +35,7 @@ class FA:
         self.__map__ = {}
         self.__start__ = None
         self.__finals__ = set()
+        self.__tags__ = {}
         self.__epsilon_clos__ = {}
 
     def map(self):
@@ -41,12 +60,8 @@ class FA:
                   }
         new.__start__ = relabel_map[self.__start__]
         new.__finals__ = { relabel_map[old] for old in self.__finals__ }
-        self.__epsilon_clos__ = { relabel_map[old]:
-                                { relabel_map[e]
-                                  for e in self.__epsilon_clos__[old]
-                                }
-                              for old in self.__epsilon_clos__
-                            }
+        new.__tags__ = { relabel_map[old]: self.__tags__[old]
+                         for old in self.__tags__ }
         return new
 
     def copy(self):
@@ -58,119 +73,181 @@ class FA:
         new.__map__ = deepcopy(self.__map__)
         new.__start__ = self.__start__
         new.__finals__ = self.__finals__.copy()
-        self.__epsilon_clos__ = deepcopy(self.__epsilon_clos__)
+        new.__tags__ = self.__tags__.copy()
+        new.__epsilon_clos__ = self.__epsilon_clos__.copy()
         return new
 
-    def partition(self, group, groups):
-        """try to partition group"""
-        if len(group) < 2:
-            return None
-        acceptable_edges = {}
-        # partition based on acceptable edges
-        for node in group:
-            edges = set()
-            if node in self.__map__:
-                for edge in self.__acceptable__:
-                    if edge in self.__map__[node]:
-                        edges.add(edge)
-            acceptable_edges.setdefault(tuple(edges), set())
-            acceptable_edges[tuple(edges)].add(node)
-        parti = []
-        for edges in acceptable_edges:
-            local_parti = {}
-            for node in acceptable_edges[edges]:
-                edge_next_pair = set()
-                for edge in edges:
-                    idx = [ list(self.__map__[node][edge])[0] in g
-                            for g in groups ].index(True)
-                    edge_next_pair.add((edge, idx))
-                edge_next_t = tuple(edge_next_pair)
-                local_parti.setdefault(edge_next_t, set())
-                local_parti[edge_next_t].add(node)
-            parti += [ list(local_parti[p]) for p in local_parti ]
-        if len(parti) > 1:
-            return parti
-        return None
+    def partition(self):
+        """
+        partition the nodes of the DFA into blocks of equivalent nodes
+
+        Hopcroft's partition refinement, O(n*k*log(n)) for n nodes and k
+        edges; undefined transitions lead to an implicit dead node, whose
+        block is returned separately as the second element
+        """
+        nodes = list(self.__nodes__ | {self.__start__})
+        index = dict(zip(nodes, range(len(nodes))))
+        dead = len(nodes)
+        edges = list(self.__acceptable__)
+        # inverse[i][node] lists the nodes entering `node` via edges[i]
+        inverse = [ [ [] for _ in xrange(dead + 1) ] for _ in edges ]
+        for i, edge in enumerate(edges):
+            inverse_edge = inverse[i]
+            for node in nodes:
+                src = index[node]
+                if node in self.__map__ and edge in self.__map__[node]:
+                    dst = index[list(self.__map__[node][edge])[0]]
+                else:
+                    dst = dead
+                inverse_edge[dst].append(src)
+            inverse_edge[dead].append(dead)
+        # final nodes with different tags are never equivalent
+        blocks = {}
+        for node in self.__finals__:
+            blocks.setdefault(self.tags(node), set()).add(index[node])
+        blocks = blocks.values()
+        finals = set().union(*blocks)
+        blocks.append(set(xrange(dead + 1)).difference(finals))
+        blocks = [ block for block in blocks if block ]
+        block_of = [0] * (dead + 1)
+        for i, block in enumerate(blocks):
+            for node in block:
+                block_of[node] = i
+        waiting = set(xrange(len(blocks)))
+        waiting.remove(max(waiting, key=lambda i: len(blocks[i])))
+        while waiting:
+            splitter = list(blocks[waiting.pop()])
+            for inverse_edge in inverse:
+                touched = {}
+                for dst in splitter:
+                    for src in inverse_edge[dst]:
+                        touched.setdefault(block_of[src], set()).add(src)
+                for i, members in touched.items():
+                    if len(members) == len(blocks[i]):
+                        continue
+                    blocks[i].difference_update(members)
+                    j = len(blocks)
+                    blocks.append(members)
+                    for node in members:
+                        block_of[node] = j
+                    if i in waiting or len(members) <= len(blocks[i]):
+                        waiting.add(j)
+                    else:
+                        waiting.add(i)
+        dead_block = block_of[dead]
+        groups = [ [ nodes[i] for i in block ]
+                   for j, block in enumerate(blocks) if j != dead_block ]
+        dead_group = { nodes[i] for i in blocks[dead_block] if i != dead }
+        return groups, dead_group
 
     def minimize(self):
-        """minimize the number of states of the DFA"""
+        """
+        minimize the number of states of the DFA, whose nodes are named
+        by the integer ids of the blocks of `partition`
+        """
         assert self.is_dfa()
-        groups = [self.__finals__,
-            self.__nodes__.difference(self.__finals__)]
-        from copy import deepcopy
-        new_groups = deepcopy(groups)
-        parti = True
-        while parti:
-            delete = None
-            for group in groups:
-                parti = self.partition(group, groups)
-                if parti:
-                    delete = group
-                    break
-            if parti:
-                new_groups.remove(delete)
-                new_groups += parti
-                groups = deepcopy(new_groups)
+        groups, dead_group = self.partition()
         new = FA()
         divide = {}
-        for group in groups:
+        for block, group in enumerate(groups):
             for node in group:
-                divide[node] = tuple(group)
+                divide[node] = block
+        for node in dead_group:
+            divide[node] = len(groups)
         for start in self.__map__:
+            if start in dead_group:
+                continue
             for edge in self.__map__[start]:
                 for dst in self.__map__[start][edge]:
-                    new.connect(divide[start], divide[dst], edge)
-        new.set_start(divide[self.__start__])
+                    if dst not in dead_group:
+                        new.connect(divide[start], divide[dst], edge)
+        new.__start__ = divide[self.__start__]
+        new.__nodes__.add(new.__start__)
         for node in self.__finals__:
-            new.add_final(divide[node])
+            new.add_final(divide[node], self.tags(node))
         return new
 
-    def reachable(self, nodes, edge):
+    def make_dfa(self, unanchored=False):
         """
-        return all the reachable nodes from any of the node in
-        `nodes` via `edge`
+        return a NFA corresponding to DFA
+
+        a node of the DFA is the epsilon-closed set of nodes of the FA it
+        stands for, interned to an integer in the order it is found, the
+        start node being 0; the targets of every node of the FA by class
+        of characters are computed once
+
+        if `unanchored` is True, the DFA accepts every string which has a
+        suffix accepted by the FA, i.e., the start node is kept in every
+        subset of nodes; characters out of the alphabet of such a DFA
+        should lead back to its start node
         """
-        if edge not in self.__acceptable__:
-            return None
-        result = set()
-        key = set()
-        for node in nodes:
-            for new_node in self.epsilon_closure(node):
-                if new_node in self.__map__ and edge in self.__map__[new_node]:
-                    for next_node in self.__map__[new_node][edge]:
-                        key.add(next_node)
-                        result.update(self.epsilon_closure(next_node))
-        return (key, result)
-
-    def make_dfa(self):
-        """return a NFA corresponding to DFA"""
         new = FA()
-        valid_acceptable = self.__acceptable__.copy()
-        if EPSILON in valid_acceptable:
-            valid_acceptable.remove(EPSILON)
-        new_nodes_set = { (self.__start__,) }
-        nodes_unmarked = { (self.__start__,) }
-
-        while nodes_unmarked:
-            node = nodes_unmarked.pop()
-            for edge in valid_acceptable:
-                key, e_clos = self.reachable(node, edge)
-                if not key:
-                    continue
-                if tuple(key) not in new_nodes_set:
-                    new_nodes_set.add(tuple(key))
-                    nodes_unmarked.add(tuple(key))
-                new.connect(node, tuple(key), edge)
-                for final in self.__finals__:
-                    if final in e_clos:
-                        new.add_final(tuple(key))
-                        break
+        classes = partition_alphabet(
+            self.__acceptable__.difference({EPSILON}))
+        # the classes a label is made of
+        label_classes = {}
+        for label in self.__acceptable__:
+            if label != EPSILON:
+                label_classes[label] = [
+                    i for i, chars in enumerate(classes)
+                    if next(iter(chars)) in label
+                ]
+        moves = {}
+        def move(node):
+            """return the targets of `node` by index of class"""
+            if node not in moves:
+                targets = {}
+                for label, dsts in self.__map__.get(node, {}).iteritems():
+                    if label != EPSILON:
+                        for i in label_classes[label]:
+                            targets.setdefault(i, set()).update(dsts)
+                moves[node] = targets
+            return moves[node]
+        start = frozenset(self.epsilon_closure(self.__start__))
+        ids = { start: 0 }
+        subsets = [ start ]
+        new.__start__ = 0
+        new.__nodes__.add(0)
+        for dfa_node, subset in enumerate(subsets):
+            targets = {}
+            for node in subset:
+                for i, dsts in move(node).iteritems():
+                    targets.setdefault(i, set()).update(dsts)
+            if unanchored:
+                for i in xrange(len(classes)):
+                    targets.setdefault(i, set())
+            for i, dsts in targets.iteritems():
+                closure = set(start) if unanchored else set()
+                for dst in dsts:
+                    closure.update(self.epsilon_closure(dst))
+                closure = frozenset(closure)
+                target = ids.get(closure)
+                if target is None:
+                    target = ids[closure] = len(subsets)
+                    subsets.append(closure)
+                new.connect(dfa_node, target, classes[i])
+            for final in self.__finals__.intersection(subset):
+                new.add_final(dfa_node, self.tags(final))
+        return new
 
-        new.set_start((self.__start__,))
+    def reverse(self):
+        """
+        return a NFA which accepts the reverse of the strings accepted
+        by the FA, whose nodes are relabeled to integers
+        """
+        nodes = list(self.__nodes__ | {self.__start__})
+        index = dict(zip(nodes, range(len(nodes))))
+        new = FA()
+        for src in self.__map__:
+            for edge in self.__map__[src]:
+                for dst in self.__map__[src][edge]:
+                    new.connect(index[dst], index[src], edge)
+        start = len(nodes)
         for final in self.__finals__:
-            if final in self.epsilon_closure(self.__start__):
-                new.add_final((self.__start__,))
-                break
+            new.connect(start, index[final], EPSILON)
+        new.__start__ = start
+        new.__nodes__.add(start)
+        new.add_final(index[self.__start__])
         return new
 
     def is_dfa(self):
@@ -185,39 +262,105 @@ class FA:
 
     def connect(self, from_node, to_node, edge):
         """
+        `edge` is EPSILON or an iterable of characters
+
         >>> fa = FA()
         >>> fa.connect(0, 1, 'a')
-        self.__map = { 0: { 'a': {1} } }
-        >>> fa.connect(0, 2, 'a').connect(1, 2, 'b')
-        self.__map = { 0: { 'a': {1, 2} },
-                     1: { 'b': {2} } }
+        self.__map = { 0: { {'a'}: {1} } }
+        >>> fa.connect(0, 2, 'a').connect(1, 2, 'bc')
+        self.__map = { 0: { {'a'}: {1, 2} },
+                     1: { {'b', 'c'}: {2} } }
         """
+        if edge != EPSILON:
+            edge = frozenset(edge)
         self.__map__.setdefault(from_node, {})
         self.__map__[from_node].setdefault(edge, set())
         self.__map__[from_node][edge].add(to_node)
         self.__acceptable__.add(edge)
+        if self.__epsilon_clos__:
+            self.__epsilon_clos__ = {}
         self.__nodes__.add(from_node)
         self.__nodes__.add(to_node)
         return self
 
+    def close(self):
+        """
+        compute the epsilon closures of all the nodes at once
+
+        the strongly connected components of the epsilon edges are found
+        by an iterative Tarjan's algorithm, which emits every component
+        after all the components reachable from it, so the closure of a
+        component is its nodes plus the closures of its successors
+        """
+        succ = lambda node: self.__map__.get(node, {}).get(EPSILON, ())
+        closures = {}
+        index = {}
+        low = {}
+        stack = []
+        for root in self.__nodes__:
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            work = [ (root, iter(succ(root))) ]
+            while work:
+                node, children = work[-1]
+                for child in children:
+                    if child not in index:
+                        index[child] = low[child] = len(index)
+                        stack.append(child)
+                        work.append((child, iter(succ(child))))
+                        break
+                    elif child not in closures:
+                        # on the stack, i.e., in the current component
+                        low[node] = min(low[node], index[child])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                    if low[node] != index[node]:
+                        continue
+                    component = set()
+                    while node not in component:
+                        component.add(stack.pop())
+                    closure = set(component)
+                    for member in component:
+                        for child in succ(member):
+                            if child not in component:
+                                closure.update(closures[child])
+                    closure = frozenset(closure)
+                    for member in component:
+                        closures[member] = closure
+        self.__epsilon_clos__ = closures
+        return self
+
     def epsilon_closure(self, node):
         """
-        return the epsilon closure of the given node
+        return the epsilon closure of the given node, as a frozenset
         """
+        if not self.__epsilon_clos__:
+            self.close()
         if node not in self.__epsilon_clos__:
-            closure = set()
-            if node in self.__map__ and EPSILON in self.__map__[node]:
-                closure.update(self.__map__[node][EPSILON])
-            new_closure = closure.copy()
-            if node in new_closure:
-                new_closure.remove(node)
-            for new_node in closure:
-                if self.epsilon_closure(new_node):
-                    new_closure.update(self.epsilon_closure(new_node))
-            new_closure.add(node)
-            self.__epsilon_clos__[node] = new_closure
+            return frozenset([node])
         return self.__epsilon_clos__[node]
 
+    def move(self, nodes, char):
+        """
+        return the epsilon closure of the nodes reachable from any of the
+        node in `nodes` via an edge accepting `char`
+        """
+        result = set()
+        for node in nodes:
+            if node not in self.__map__:
+                continue
+            for label, next_nodes in self.__map__[node].iteritems():
+                if label == EPSILON or char not in label:
+                    continue
+                for next_node in next_nodes:
+                    result.update(self.epsilon_closure(next_node))
+        return result
+
     def validate(self, edges):
         """
         validate if a string can be accepted by the FA
@@ -229,12 +372,7 @@ class FA:
         """
         current = self.epsilon_closure(self.__start__)
         for edge in edges:
-            new_current = set()
-            for node in current:
-                if node in self.__map__ and edge in self.__map__[node]:
-                    for next_node in self.__map__[node][edge]:
-                        new_current.update(self.epsilon_closure(next_node))
-            current = new_current
+            current = self.move(current, edge)
         return self.__any_terminant__(current)
 
     def try_match(self, edges):
@@ -250,16 +388,80 @@ class FA:
         idx = 0
         current = self.epsilon_closure(self.__start__)
         for i, edge in enumerate(edges):
-            new_current = set()
-            for node in current:
-                if node in self.__map__ and edge in self.__map__[node]:
-                    for next_node in self.__map__[node][edge]:
-                        new_current.update(self.epsilon_closure(next_node))
-            current = new_current
+            current = self.move(current, edge)
             if self.__any_terminant__(current):
                 idx = i+1
         return idx
 
+    def initial(self):
+        """return the set of nodes the FA is in before any input"""
+        return self.epsilon_closure(self.__start__)
+
+    def accepts(self, nodes):
+        """whether any node in `nodes` is a final node"""
+        return self.__any_terminant__(nodes)
+
+    @staticmethod
+    def is_dead(nodes):
+        """whether no string can be accepted from `nodes`"""
+        return not nodes
+
+    def feed(self, nodes, edges):
+        """
+        run the FA over `edges` from the set of nodes `nodes`
+
+        return the set of nodes reached and the maximum index that leads
+        to a final node, if there is no such index, the latter is -1
+        """
+        last = -1
+        for i, edge in enumerate(edges):
+            nodes = self.move(nodes, edge)
+            if not nodes:
+                break
+            if self.__any_terminant__(nodes):
+                last = i+1
+        return nodes, last
+
+    def longest(self, edges, pos=0, end=None):
+        """
+        return the maximum index that makes
+        self.validate(edges[pos:index]) True, for index up to `end`, the
+        end of `edges` by default; if there is no such index, return -1
+        """
+        if end is None:
+            end = len(edges)
+        current = self.epsilon_closure(self.__start__)
+        last = pos if self.__any_terminant__(current) else -1
+        for i in xrange(pos, end):
+            current = self.move(current, edges[i])
+            if not current:
+                break
+            if self.__any_terminant__(current):
+                last = i+1
+        return last
+
+    def size(self):
+        """getter: number of nodes"""
+        return len(self.__nodes__ | {self.__start__})
+
+    def edge_count(self):
+        """getter: number of edges, one per label and target node"""
+        return sum(len(dsts) for edges in self.__map__.itervalues()
+                   for dsts in edges.itervalues())
+
+    def memory(self):
+        """
+        return an estimate of the bytes taken by the nodes and the maps,
+        labels being shared and not counted
+        """
+        from sys import getsizeof
+        total = getsizeof(self.__nodes__) + getsizeof(self.__map__)
+        for edges in self.__map__.itervalues():
+            total += getsizeof(edges)
+            for dsts in edges.itervalues():
+                total += getsizeof(dsts)
+        return total
+
     def start_node(self):
         """getter: start node"""
         return self.__start__
@@ -276,14 +478,60 @@ class FA:
         """getter: final nodes"""
         return self.__finals__
 
-    def add_final(self, node):
-        """setter: final nodes"""
+    def add_final(self, node, tags=()):
+        """
+        setter: final nodes
+
+        `tags` are added to the tags of the final node, which tell the
+        patterns it accepts when the FA is made of several ones
+        """
         if node in self.__nodes__:
             self.__finals__.add(node)
+            if tags:
+                self.__tags__[node] = self.tags(node).union(tags)
         else:
             return None
         return self
 
+    def tags(self, node):
+        """getter: tags of a final node"""
+        return self.__tags__.get(node, frozenset())
+
+    def prioritize(self):
+        """
+        keep only the smallest tag of every final node, i.e., the first
+        of the patterns it accepts, see `union`
+        """
+        for node in self.__tags__:
+            self.__tags__[node] = frozenset([ min(self.__tags__[node]) ])
+        return self
+
+    @staticmethod
+    def union(automata):
+        """
+        return a NFA accepting the strings accepted by any of `automata`,
+        whose final nodes are tagged with the index of their automaton
+
+        nodes are relabeled to integers, node 0 is the start node
+        """
+        new = FA()
+        new.__start__ = 0
+        new.__nodes__.add(0)
+        offset = 1
+        for tag, fa in enumerate(automata):
+            nodes = list(fa.__nodes__ | {fa.start_node()})
+            index = dict(zip(nodes, xrange(offset, offset + len(nodes))))
+            fa_map = fa.map()
+            for src in fa_map:
+                for edge in fa_map[src]:
+                    for dst in fa_map[src][edge]:
+                        new.connect(index[src], index[dst], edge)
+            new.connect(0, index[fa.start_node()], EPSILON)
+            for final in fa.final_nodes():
+                new.add_final(index[final], [tag])
+            offset += len(nodes)
+        return new
+
     def __any_terminant__(self, nodes):
         """
         whether at least a terminant exists in `nodes`
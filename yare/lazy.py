@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# coding:utf-8
+
+"""Deterministic Finite Automata built on demand"""
+
+from itertools import imap
+
+class LazyDFA:
+    """
+    DFA whose states are subsets of nodes of a NFA, built only when the
+    input first reaches them
+
+    at most `max_states` states are cached, the cache is flushed when it
+    is full; if it is flushed again before `thrash_ratio` characters per
+    cached state have been consumed since the previous flush, the DFA
+    falls back to simulating the NFA for good, from the very character
+    on which it happens
+    """
+    MAX_STATES = 10000
+    THRASH_RATIO = 10
+
+    def __init__(self, nfa, max_states=MAX_STATES, thrash_ratio=THRASH_RATIO):
+        self.__nfa__ = nfa
+        self.__max_states__ = max_states
+        self.__thrash_ratio__ = thrash_ratio
+        self.__start__ = frozenset(nfa.initial())
+        self.__rows__ = {}
+        self.__fed__ = 0
+        self.__flushes__ = 0
+        self.__fallback__ = False
+
+    def flush(self):
+        """drop all the cached states"""
+        if self.__flushes__ and self.__rows__ and \
+                self.__fed__ < self.__thrash_ratio__ * self.__max_states__:
+            self.__fallback__ = True
+        self.__rows__ = {}
+        self.__fed__ = 0
+        self.__flushes__ += 1
+
+    def info(self):
+        """return the number of cached states, flushes and fallback flag"""
+        return len(self.__rows__), self.__flushes__, self.__fallback__
+
+    def __row__(self, state):
+        """return the cached row of `state`, adding it if necessary"""
+        row = self.__rows__.get(state)
+        if row is None:
+            if len(self.__rows__) >= self.__max_states__:
+                self.flush()
+            row = (self.__nfa__.accepts(state), {})
+            self.__rows__[state] = row
+        return row
+
+    def to_fa(self):
+        """return the NFA as a FA"""
+        return self.__nfa__.to_fa()
+
+    def initial(self):
+        """getter: start state"""
+        return self.__start__
+
+    def accepts(self, state):
+        """whether `state` is a final state"""
+        return self.__row__(state)[0]
+
+    @staticmethod
+    def is_dead(state):
+        """whether `state` is the dead state"""
+        return not state
+
+    def feed(self, state, edges):
+        """
+        run the DFA over `edges` from `state`, stopping at the dead state
+
+        return the state reached and the maximum index that leads to a
+        final state, if there is no such index, the latter is -1
+        """
+        if self.__fallback__:
+            state, last = self.__nfa__.feed(state, edges)
+            return frozenset(state), last
+        last = -1
+        row = self.__row__(state)
+        it = enumerate(edges, 1)
+        for i, edge in it:
+            # counted first, a flush in `__row__` sees it
+            self.__fed__ += 1
+            next_state = row[1].get(edge)
+            if next_state is None:
+                next_state = frozenset(self.__nfa__.move(state, edge))
+                row[1][edge] = next_state
+            state = next_state
+            if not state:
+                break
+            row = self.__row__(state)
+            if row[0]:
+                last = i
+            if self.__fallback__:
+                state, rest = self.__nfa__.feed(state,
+                                                (edge for _, edge in it))
+                return frozenset(state), i + rest if rest >= 0 else last
+        return state, last
+
+    def validate(self, edges):
+        """
+        validate if a string can be accepted by the DFA
+
+        return True if the string ends in a final state, otherwise False
+        """
+        return self.accepts(self.feed(self.__start__, edges)[0])
+
+    def try_match(self, edges):
+        """
+        try to match string as long as possible
+
+        return the maximum index that makes self.validate(edges[:index])
+        True, if there is no such index, return 0
+        """
+        return max(self.feed(self.__start__, edges)[1], 0)
+
+    def longest(self, edges, pos=0, end=None):
+        """
+        return the maximum index that makes
+        self.validate(edges[pos:index]) True, for index up to `end`, the
+        end of `edges` by default; if there is no such index, return -1
+        """
+        if end is None:
+            end = len(edges)
+        last = self.feed(self.__start__,
+                         imap(edges.__getitem__, xrange(pos, end)))[1]
+        if last >= 0:
+            return pos + last
+        return pos if self.accepts(self.__start__) else -1
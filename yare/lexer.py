@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# coding:utf-8
+
+"""maximal-munch lexer over several token patterns"""
+
+from fa import FA
+from table import Table
+from regex import build_nfa
+from stream import iter_chunks, CHUNK_SIZE
+
+class Lexer:
+    """
+    lexer whose token types are given as `(name, pattern)` rules
+
+    all the rules are compiled to one DFA, whose final states are tagged
+    with the first rule they accept; the input is split into the longest
+    possible tokens, ties going to the earlier rule
+    """
+    def __init__(self, rules):
+        rules = list(rules)
+        self.__names__ = [ name for name, _ in rules ]
+        nfa = FA.union([ build_nfa(pattern) for _, pattern in rules ])
+        fa = nfa.make_dfa().prioritize().minimize().relabel()
+        self.__table__ = Table(fa)
+
+    def names(self):
+        """getter: names of the token types"""
+        return self.__names__
+
+    def tokenize(self, source, size=CHUNK_SIZE):
+        """
+        yield the tokens `(name, text, offset)` of `source`, which is a
+        string, a file object or an iterable of strings, see `iter_chunks`
+
+        the input is consumed in a single pass, keeping only the text
+        since the start of the current token; a ValueError is raised if
+        no rule matches a non-empty string at some offset
+        """
+        table = self.__table__
+        if isinstance(source, basestring):
+            chunks = iter([ source ])
+        else:
+            chunks = iter_chunks(source, size)
+        # the text of the current token starts at buf[begin], or at the
+        # first of `parts` if it runs over chunks, which are only joined
+        # when a token is yielded
+        parts = []
+        buf = ''
+        begin = pos = offset = done = 0
+        state, end, rule = table.initial(), -1, None
+        exhausted = False
+        while True:
+            while pos < len(buf) and not table.is_dead(state):
+                state = table.step(state, buf[pos])
+                pos += 1
+                tags = table.tags(state)
+                if tags:
+                    end, rule = offset + done + pos - begin, tags[0]
+            if not table.is_dead(state) and not exhausted:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                else:
+                    parts.append(buf[begin:])
+                    done += len(buf) - begin
+                    buf, begin, pos = chunk, 0, 0
+                continue
+            if parts:
+                buf = ''.join(parts) + buf
+                pos += done
+                parts, done = [], 0
+            if begin == len(buf):
+                return
+            if end < 0:
+                raise ValueError('no token matches `%s` at offset %d'
+                    % (buf[begin:begin + 16], offset))
+            yield (self.__names__[rule], buf[begin:begin + end - offset],
+                   offset)
+            begin = pos = begin + end - offset
+            offset = end
+            state, end, rule = table.initial(), -1, None
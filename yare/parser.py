@@ -5,21 +5,24 @@
 
 from fa import EPSILON
 
-from regex import State, StateGraph
+from regex import StateGraph, allocator
+import prefilter
 
 __END__ = '$'
 
-class Elem:
+QUANTIFIERS = { '*' : (0, None), '+' : (1, None), '?' : (0, 1), }
+MAX_REPEAT = 65535
+
+class Elem(object):
     """an element in regular expression"""
-    def __init__(self, lexical, raw_str, value, offset):
+    __slots__ = ('__lexical__', '__raw_str__', '__value__', '__offset__',
+                 'graph')
+    def __init__(self, lexical, raw_str, value, offset, graph=None):
         self.__lexical__ = lexical
         self.__raw_str__ = raw_str
         self.__value__ = value
         self.__offset__ = offset
-        s0 = State()
-        s1 = State()
-        s0.link(s1, self.__value__)
-        self.graph = StateGraph(s0, s1)
+        self.graph = graph
     def __str__(self):
         return '`%s`, at column %d, of type %s' % \
             (self.__value__, self.__offset__, self.__lexical__)
@@ -33,39 +36,155 @@ class Elem:
         """get the value of this elem"""
         return self.__value__
 
+def charset_graph(charset, new_state):
+    """
+    return a graph of a single edge accepting any character in `charset`,
+    made of states allocated by `new_state`
+    """
+    s0 = new_state()
+    s1 = new_state()
+    s0.link(s1, charset)
+    return StateGraph(s0, s1, charset, prefilter.literal(charset))
+
+def literal_graph(value, new_state):
+    """
+    return a graph of a single edge accepting the literal `value`, made
+    of states allocated by `new_state`
+    """
+    if value != EPSILON:
+        return charset_graph(frozenset([value]), new_state)
+    s0 = new_state()
+    s1 = new_state()
+    s0.link(s1, EPSILON)
+    return StateGraph(s0, s1, info=prefilter.empty())
+
+def quantifier(raw):
+    """
+    return the range `(low, high)` of the repetitions of a quantifier,
+    `*`, `+`, `?`, `{m}`, `{m,}`, `{,n}` or `{m,n}`, high being None if
+    there is no bound; raise ValueError if it is invalid or if a bound
+    exceeds `MAX_REPEAT`
+    """
+    if raw in QUANTIFIERS:
+        return QUANTIFIERS[raw]
+    low, comma, high = raw[1:-1].partition(',')
+    if not comma:
+        high = low
+    if not (low or high) or not (low or '0').isdigit() or \
+            high and not high.isdigit():
+        raise ValueError(raw)
+    low = int(low or 0)
+    high = int(high) if high else None
+    if high is not None and high < low or \
+            max(low, high) > MAX_REPEAT:
+        raise ValueError(raw)
+    return low, high
+
+def repeat_graph(graph, low, high, new_state):
+    """
+    return a graph accepting `low` to `high` repetitions of `graph`, at
+    least `low` if `high` is None, made of copies of `graph` and states
+    allocated by `new_state`
+    """
+    if (low, high) == (1, 1):
+        return graph
+    s0 = new_state()
+    s1 = new_state()
+    result = StateGraph(s0, s1, info=prefilter.repeat(graph.info, low, high))
+    if (low, high) == (0, None):
+        s0.link(graph.start, EPSILON)
+        s0.link(s1, EPSILON)
+        graph.final.link(s1, EPSILON)
+        graph.final.link(s0, EPSILON)
+        return result
+    # the copies are made before `graph` gets any edge out of its final
+    count = low if high is None else high
+    copies = [ graph ] + [ graph.copy(new_state) for _ in xrange(count - 1) ]
+    last = s0
+    for copy in copies[:low]:
+        last.link(copy.start, EPSILON)
+        last = copy.final
+    if high is None:
+        last.link(copies[-1].start, EPSILON)
+    else:
+        for copy in copies[low:high]:
+            last.link(s1, EPSILON)
+            last.link(copy.start, EPSILON)
+            last = copy.final
+    last.link(s1, EPSILON)
+    return result
+
 class ReStream:
-    """input stream of re string"""
-    SPEC_SYM = { '|', '*', '(', ')', }
+    """
+    input stream of re string
+
+    the string is scanned by index, and only literals (`F`) get a graph;
+    every quantifier is a `Q`, whose value is its text, see `quantifier`
+    """
+    SPEC_SYM = { '|', '(', ')', }
     ESCAPE_SYM = { '\\e' : EPSILON, '\|' : '|', '\*' : '*',
-        '\(' : '(', '\)' : ')', '\\\\' : '\\', }
-    def __init__(self, string):
+        '\(' : '(', '\)' : ')', '\\\\' : '\\', '\+' : '+', '\?' : '?',
+        '\{' : '{', '\}' : '}', }
+    def __init__(self, string, new_state):
         self.__string__ = string
+        self.__new_state__ = new_state
+        self.__index__ = 0
         self.__offset__ = 0
     def __iter__(self):
         return self
     def next(self):
         """get next element"""
-        while self.__string__:
-            next_elem = self.__string__[0]
-            lexical = 'F'
+        string = self.__string__
+        length = len(string)
+        while self.__index__ < length:
+            idx = self.__index__
+            next_elem = string[idx]
             if next_elem != '\\':
-                self.__string__ = self.__string__[1:]
+                self.__index__ = idx + 1
                 if next_elem in ReStream.SPEC_SYM:
-                    lexical = next_elem
+                    yield Elem(next_elem, next_elem, next_elem,
+                        self.__offset__)
+                    self.__offset__ += 1
+                    continue
+                if next_elem in QUANTIFIERS or next_elem == '{':
+                    yield Elem('Q', next_elem, self.__quantifier__(idx),
+                        self.__offset__)
+                    self.__offset__ += 1
+                    continue
                 elem_value = next_elem
             else:
-                next_elem = self.__string__[:2]
-                self.__string__ = self.__string__[2:]
+                next_elem = string[idx:idx + 2]
+                self.__index__ = idx + 2
                 if next_elem not in ReStream.ESCAPE_SYM:
                     raise SyntaxWarning(
                         '`%s` escaped invalid character' % next_elem
                         )
                 elem_value = ReStream.ESCAPE_SYM[next_elem]
-            yield Elem(lexical, next_elem, elem_value, self.__offset__)
+            yield Elem('F', next_elem, elem_value, self.__offset__,
+                literal_graph(elem_value, self.__new_state__))
             self.__offset__ += 1
+    def __quantifier__(self, idx):
+        """
+        return the text of the quantifier at index `idx`, and move past
+        it; raise SyntaxError if it is invalid
+        """
+        string = self.__string__
+        if string[idx] != '{':
+            return string[idx]
+        end = string.find('}', idx)
+        raw = string[idx:end + 1] if end >= 0 else string[idx:]
+        try:
+            if end < 0:
+                raise ValueError(raw)
+            quantifier(raw)
+        except ValueError:
+            raise SyntaxError('invalid repetition `%s` in column %d'
+                % (raw, self.__offset__))
+        self.__index__ = end + 1
+        return raw
     def has_next(self):
         """whether the stream has any string remaining"""
-        return self.__string__
+        return self.__index__ < len(self.__string__)
     def offset(self):
         """getter : offset in total"""
         return self.__offset__
@@ -98,7 +217,7 @@ __goto_table__ = (
     {}, # 24
 )
 
-def reduce1(state_stack, parse_stack, input_stack):
+def reduce1(state_stack, parse_stack, input_stack, new_state):
     """reduce => s : t"""
     state_stack.pop()
     p1 = parse_stack.pop()
@@ -108,7 +227,7 @@ def reduce1(state_stack, parse_stack, input_stack):
     p0.graph = p1.graph
     parse_stack.append(p0)
 
-def reduce2(state_stack, parse_stack, input_stack):
+def reduce2(state_stack, parse_stack, input_stack, new_state):
     """reduce => s : t | s"""
     state_stack.pop()
     p3 = parse_stack.pop()
@@ -121,16 +240,23 @@ def reduce2(state_stack, parse_stack, input_stack):
     assert p1.lexical_unit() == 't'
     state_stack.append(__goto_table__[state_stack[-1]]['s'])
     p0 = Elem('s', 's', 's', p1.offset())
-    s0 = State()
-    s1 = State()
-    p0.graph = StateGraph(s0, s1)
+    if p1.graph.charset and p3.graph.charset:
+        # a selection between characters is a single edge
+        p0.graph = charset_graph(p1.graph.charset | p3.graph.charset,
+            new_state)
+        parse_stack.append(p0)
+        return
+    s0 = new_state()
+    s1 = new_state()
+    p0.graph = StateGraph(s0, s1,
+        info=prefilter.select(p1.graph.info, p3.graph.info))
     s0.link(p1.graph.start, EPSILON)
     s0.link(p3.graph.start, EPSILON)
     p1.graph.final.link(s1, EPSILON)
     p3.graph.final.link(s1, EPSILON)
     parse_stack.append(p0)
 
-def reduce3(state_stack, parse_stack, input_stack):
+def reduce3(state_stack, parse_stack, input_stack, new_state):
     """reduce => t : x"""
     state_stack.pop()
     p1 = parse_stack.pop()
@@ -140,7 +266,7 @@ def reduce3(state_stack, parse_stack, input_stack):
     p0.graph = p1.graph
     parse_stack.append(p0)
 
-def reduce4(state_stack, parse_stack, input_stack):
+def reduce4(state_stack, parse_stack, input_stack, new_state):
     """reduce => t : x t"""
     state_stack.pop()
     p2 = parse_stack.pop()
@@ -151,10 +277,11 @@ def reduce4(state_stack, parse_stack, input_stack):
     state_stack.append(__goto_table__[state_stack[-1]]['t'])
     p0 = Elem('t', 't', 't', p1.offset())
     p1.graph.final.link(p2.graph.start, EPSILON)
-    p0.graph = StateGraph(p1.graph.start, p2.graph.final)
+    p0.graph = StateGraph(p1.graph.start, p2.graph.final,
+        info=prefilter.concat(p1.graph.info, p2.graph.info))
     parse_stack.append(p0)
 
-def reduce5(state_stack, parse_stack, input_stack):
+def reduce5(state_stack, parse_stack, input_stack, new_state):
     """reduce => x : ( s )"""
     state_stack.pop()
     p3 = parse_stack.pop()
@@ -170,11 +297,11 @@ def reduce5(state_stack, parse_stack, input_stack):
     p0.graph = p2.graph
     parse_stack.append(p0)
 
-def reduce6(state_stack, parse_stack, input_stack):
-    """reduce => x : ( s ) *"""
+def reduce6(state_stack, parse_stack, input_stack, new_state):
+    """reduce => x : ( s ) Q"""
     state_stack.pop()
     p4 = parse_stack.pop()
-    assert p4.lexical_unit() == '*'
+    assert p4.lexical_unit() == 'Q'
     state_stack.pop()
     p3 = parse_stack.pop()
     assert p3.lexical_unit() == ')'
@@ -186,16 +313,11 @@ def reduce6(state_stack, parse_stack, input_stack):
     assert p1.lexical_unit() == '('
     state_stack.append(__goto_table__[state_stack[-1]]['x'])
     p0 = Elem('x', 'x', 'x', p1.offset())
-    s0 = State()
-    s1 = State()
-    p0.graph = StateGraph(s0, s1)
-    s0.link(p2.graph.start, EPSILON)
-    s0.link(s1, EPSILON)
-    p2.graph.final.link(s1, EPSILON)
-    p2.graph.final.link(s0, EPSILON)
+    low, high = quantifier(p4.value())
+    p0.graph = repeat_graph(p2.graph, low, high, new_state)
     parse_stack.append(p0)
 
-def reduce7(state_stack, parse_stack, input_stack):
+def reduce7(state_stack, parse_stack, input_stack, new_state):
     """reduce => x : F"""
     state_stack.pop()
     p1 = parse_stack.pop()
@@ -205,26 +327,21 @@ def reduce7(state_stack, parse_stack, input_stack):
     p0.graph = p1.graph
     parse_stack.append(p0)
 
-def reduce8(state_stack, parse_stack, input_stack):
-    """reduce => x : F *"""
+def reduce8(state_stack, parse_stack, input_stack, new_state):
+    """reduce => x : F Q"""
     state_stack.pop()
     p2 = parse_stack.pop()
-    assert p2.lexical_unit() == '*'
+    assert p2.lexical_unit() == 'Q'
     state_stack.pop()
     p1 = parse_stack.pop()
     assert p1.lexical_unit() == 'F'
     state_stack.append(__goto_table__[state_stack[-1]]['x'])
     p0 = Elem('x', 'x', 'x', p1.offset())
-    s0 = State()
-    s1 = State()
-    p0.graph = StateGraph(s0, s1)
-    s0.link(p1.graph.start, EPSILON)
-    s0.link(s1, EPSILON)
-    p1.graph.final.link(s1, EPSILON)
-    p1.graph.final.link(s0, EPSILON)
+    low, high = quantifier(p2.value())
+    p0.graph = repeat_graph(p1.graph, low, high, new_state)
     parse_stack.append(p0)
 
-def __acc__(state_stack, parse_stack, input_stack):
+def __acc__(state_stack, parse_stack, input_stack, new_state):
     """function of accept"""
     assert state_stack == [ 0, 1 ] and len(parse_stack) == 1 and \
         parse_stack[0].lexical_unit() == 's'
@@ -232,7 +349,7 @@ def __acc__(state_stack, parse_stack, input_stack):
 
 def __s__(state):
     """return a shift function to state"""
-    def shift(state_stack, parse_stack, input_stack):
+    def shift(state_stack, parse_stack, input_stack, new_state):
         """shift to state"""
         state_stack.append(state)
         parse_stack.append(input_stack.pop())
@@ -252,7 +369,7 @@ __action_table__ = (
     { '|' : __s__(6), '$' : __r__(1) }, # 2
     { '(' : __s__(4), 'F' : __s__(5), '$' : __r__(3), '|' : __r__(3) }, # 3
     { '(' : __s__(12), 'F' : __s__(13) }, # 4
-    { '*' : __s__(14), '$' : __r__(7), '|' : __r__(7), '(' : __r__(7),
+    { 'Q' : __s__(14), '$' : __r__(7), '|' : __r__(7), '(' : __r__(7),
         'F' : __r__(7) }, # 5
     { '(' : __s__(4), 'F' : __s__(5) }, # 6
     { '$' : __r__(4), '|' : __r__(4) }, # 7
@@ -261,11 +378,11 @@ __action_table__ = (
     { '|' : __s__(17), ')' : __r__(1) }, # 10
     { '(' : __s__(12), 'F' : __s__(13), '|' : __r__(3), ')' : __r__(3) }, # 11
     { '(' : __s__(12), 'F' : __s__(13) }, # 12
-    { '*' : __s__(20), '|' : __r__(7), '(' : __r__(7), ')' : __r__(7),
+    { 'Q' : __s__(20), '|' : __r__(7), '(' : __r__(7), ')' : __r__(7),
         'F' : __r__(7) }, # 13
     { '$' : __r__(8), '|' : __r__(8), '(' : __r__(8), 'F' : __r__(8) }, # 14
     { '$' : __r__(2) }, # 15
-    { '*' : __s__(21), '(' : __r__(5), 'F' : __r__(5), '$' : __r__(5),
+    { 'Q' : __s__(21), '(' : __r__(5), 'F' : __r__(5), '$' : __r__(5),
         '|' : __r__(5) }, # 16
     { '(' : __s__(12), 'F' : __s__(13) }, # 17
     { '|' : __r__(4), ')' : __r__(4) }, # 18
@@ -273,14 +390,15 @@ __action_table__ = (
     { '|' : __r__(8), '(' : __r__(8), ')' : __r__(8), 'F' : __r__(8) }, # 20
     { '$' : __r__(6), '|' : __r__(6), '(' : __r__(6), 'F' : __r__(6) }, # 21
     { ')' : __r__(2) }, # 22
-    { '*' : __s__(24), '|' : __r__(5), '(' : __r__(5), ')' : __r__(5),
+    { 'Q' : __s__(24), '|' : __r__(5), '(' : __r__(5), ')' : __r__(5),
         'F' : __r__(5) }, # 23
     { '|' : __r__(6), '(' : __r__(6), ')' : __r__(6), 'F' : __r__(6) }, # 24
 )
 
 def parse(re_str):
     """main function to parse re string"""
-    istream = ReStream(re_str)
+    new_state = allocator()
+    istream = ReStream(re_str, new_state)
     tokens = list(istream.next())
     __end__ = Elem(__END__, '', __END__, istream.offset())
     tokens.append(__end__)
@@ -297,7 +415,7 @@ def parse(re_str):
                         is_top.offset())
             )
         __action_table__[ss_top][is_top.lexical_unit()](
-            state_stack, parse_stack, input_stack
+            state_stack, parse_stack, input_stack, new_state
         )
     return parse_stack[0].graph
 
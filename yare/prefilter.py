@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+# coding:utf-8
+
+"""required literals of patterns, checked before any automaton is run"""
+
+from os.path import commonprefix
+
+MAX_EXACT = 16
+MAX_LENGTH = 64
+
+__chars__ = {}
+
+class Info(object):
+    """
+    what all the strings matched by a pattern have in common
+
+    `exact` is the set of these strings if there are at most `MAX_EXACT`
+    of them, none longer than `MAX_LENGTH`, otherwise None; every one of
+    them starts with `prefix`, ends with `suffix` and contains
+    `required`; `first` is the set of the first characters of the
+    non-empty ones, and `nullable` whether the empty string is one of
+    them
+
+    the literals are cut to `MAX_LENGTH` characters, so that the info of
+    a long pattern is built in linear time
+    """
+    __slots__ = ('exact', 'prefix', 'suffix', 'required', 'first',
+                 'nullable')
+    def __init__(self, exact, prefix, suffix, required, first, nullable):
+        self.exact = exact
+        self.prefix = prefix
+        self.suffix = suffix
+        self.required = required
+        self.first = first
+        self.nullable = nullable
+
+def __suffix__(strings):
+    """return the longest common suffix of `strings`"""
+    return commonprefix([ string[::-1] for string in strings ])[::-1]
+
+def __join__(strings, other, common, before=False):
+    """
+    return `common` of the strings of `strings` joined with `other`,
+    before them if `before`
+    """
+    if len(strings) == 1:
+        for string in strings:
+            return other + string if before else string + other
+    if before:
+        return common([ other + string for string in strings ])
+    return common([ string + other for string in strings ])
+
+def __longest__(*strings):
+    """return the longest of `strings`, the first one on ties"""
+    return max(strings, key=len)
+
+def exact(strings):
+    """return the info of a pattern matching exactly `strings`"""
+    strings = frozenset(strings)
+    if len(strings) == 1:
+        for string in strings:
+            return Info(strings if len(string) <= MAX_LENGTH else None,
+                        string[:MAX_LENGTH], string[-MAX_LENGTH:],
+                        string[:MAX_LENGTH], frozenset(string[:1]),
+                        not string)
+    prefix = commonprefix(list(strings))[:MAX_LENGTH]
+    suffix = __suffix__(strings)[-MAX_LENGTH:]
+    required = __longest__(prefix, suffix)
+    if any(len(string) > MAX_LENGTH for string in strings):
+        exact = None
+    else:
+        exact = strings
+    return Info(exact, prefix, suffix, required,
+                frozenset(string[0] for string in strings if string),
+                '' in strings)
+
+def empty():
+    """return the info of the empty pattern"""
+    return exact([ '' ])
+
+def literal(charset):
+    """
+    return the info of a pattern matching a character of `charset`, the
+    one of a single character being shared
+    """
+    if len(charset) == 1:
+        # keyed by type too, a `str` is never compared with a `unicode`
+        key = [ (type(char), char) for char in charset ][0]
+        info = __chars__.get(key)
+        if info is None:
+            info = __chars__[key] = exact(charset)
+        return info
+    if len(charset) <= MAX_EXACT:
+        return exact(charset)
+    return Info(None, '', '', '', frozenset(charset), False)
+
+def concat(head, tail):
+    """return the info of the concatenation of `head` and `tail`"""
+    if head.exact is not None and tail.exact is not None and \
+            len(head.exact) * len(tail.exact) <= MAX_EXACT:
+        return exact(x + y for x in head.exact for y in tail.exact)
+    prefix = head.prefix
+    if head.exact is not None:
+        prefix = __join__(head.exact, tail.prefix, commonprefix)
+    suffix = tail.suffix
+    if tail.exact is not None:
+        suffix = __join__(tail.exact, head.suffix, __suffix__, True)
+    first = head.first | tail.first if head.nullable else head.first
+    return Info(None, prefix[:MAX_LENGTH], suffix[-MAX_LENGTH:],
+                __longest__(head.required, tail.required,
+                            (head.suffix + tail.prefix)[:MAX_LENGTH],
+                            prefix[:MAX_LENGTH], suffix[-MAX_LENGTH:]),
+                first, head.nullable and tail.nullable)
+
+def select(left, right):
+    """return the info of the selection between `left` and `right`"""
+    if left.exact is not None and right.exact is not None and \
+            len(left.exact | right.exact) <= MAX_EXACT:
+        return exact(left.exact | right.exact)
+    prefix = commonprefix([ left.prefix, right.prefix ])
+    suffix = __suffix__([ left.suffix, right.suffix ])
+    if left.required in right.required:
+        required = left.required
+    elif right.required in left.required:
+        required = right.required
+    else:
+        required = ''
+    return Info(None, prefix, suffix,
+                __longest__(required, prefix, suffix),
+                left.first | right.first, left.nullable or right.nullable)
+
+def loop(body):
+    """return the info of the loop of `body`"""
+    if body.exact == frozenset([ '' ]):
+        return body
+    return Info(None, '', '', '', body.first, True)
+
+def repeat(body, low, high):
+    """
+    return the info of `low` to `high` repetitions of `body`, at least
+    `low` if `high` is None
+    """
+    if high is None:
+        info = loop(body)
+    else:
+        info = empty()
+        for _ in xrange(high - low):
+            info = select(empty(), concat(body, info))
+    for _ in xrange(low):
+        info = concat(body, info)
+    return info
+
+class Prefilter(object):
+    """
+    checks of strings against the `Info` of a pattern, done with
+    `str.find`, `str.startswith` and so on, which reject most of the
+    strings the pattern cannot match before any automaton is run
+
+    only `str` and `unicode` strings are checked, and only those of the
+    type of the literals; `checks` counts the strings checked and
+    `rejects` the ones rejected
+    """
+    def __init__(self, info):
+        self.__info__ = info
+        self.__types__ = __types__(info)
+        self.checks = 0
+        self.rejects = 0
+
+    @staticmethod
+    def of(info):
+        """
+        return the prefilter of `info`, None if it has nothing to check
+        but the first character of a pattern matching the empty string
+        """
+        if info is None or info.exact is None and info.nullable and \
+                not (info.prefix or info.suffix or info.required):
+            return None
+        return Prefilter(info)
+
+    def info(self):
+        """getter: info"""
+        return self.__info__
+
+    def __reject__(self, rejected):
+        """count a check, return whether it passed"""
+        self.checks += 1
+        if rejected:
+            self.rejects += 1
+        return not rejected
+
+    def match(self, string, start=0, end=None):
+        """whether string[start:end] may match the pattern"""
+        if not isinstance(string, self.__types__):
+            return True
+        info = self.__info__
+        end = len(string) if end is None else min(end, len(string))
+        if info.exact is not None:
+            return self.__reject__(string[start:end] not in info.exact)
+        if start >= end:
+            return self.__reject__(not info.nullable)
+        return self.__reject__(string[start] not in info.first or
+            not string.startswith(info.prefix, start, end) or
+            not string.endswith(info.suffix, start, end) or
+            string.find(info.required, start, end) < 0)
+
+    def match_prefix(self, string, start=0, end=None):
+        """
+        whether a non-empty prefix of string[start:end] may match the
+        pattern
+        """
+        if not isinstance(string, self.__types__):
+            return True
+        info = self.__info__
+        end = len(string) if end is None else min(end, len(string))
+        return self.__reject__(start >= end or
+            string[start] not in info.first or
+            not string.startswith(info.prefix, start, end) or
+            string.find(info.required, start, end) < 0)
+
+    def search(self, string, pos=0, end=None):
+        """
+        return the first index of string[pos:end] where a match of the
+        pattern may start, -1 if there is none
+        """
+        if not isinstance(string, self.__types__):
+            return pos
+        info = self.__info__
+        end = len(string) if end is None else min(end, len(string))
+        if info.required and string.find(info.required, pos, end) < 0:
+            self.__reject__(True)
+            return -1
+        if info.prefix:
+            pos = string.find(info.prefix, pos, end)
+        self.__reject__(pos < 0)
+        return pos
+
+    def counts(self):
+        """
+        return the strings checked, the ones rejected, and the rate of
+        the latter, as a dict
+        """
+        return {
+            'checks': self.checks,
+            'rejects': self.rejects,
+            'hit_rate': float(self.rejects) / self.checks
+                        if self.checks else 0.0,
+        }
+
+def __types__(info):
+    """
+    return the types of the strings which can be checked against `info`:
+    the type of its literals and first characters, since comparing a
+    non-ASCII `str` with a `unicode` fails, and the other way round;
+    any type if they are all empty, none if their types differ
+    """
+    literals = [ info.prefix, info.suffix, info.required ]
+    literals.extend(info.exact or [])
+    literals.extend(info.first)
+    kinds = set(type(literal) for literal in literals if literal)
+    if not kinds:
+        return basestring
+    if len(kinds) == 1:
+        return tuple(kinds)
+    return ()
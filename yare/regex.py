@@ -3,84 +3,484 @@
 
 """init file of the package"""
 
+from itertools import count
+
 from fa import FA
+from table import Table, ByteTable
+from codegen import CodeTable
+from lazy import LazyDFA
+from bitnfa import BitNFA
+from compact import CompactNFA
+from search import Searcher
+from stream import Matcher, CHUNK_SIZE
+from cache import LRUCache
+from stats import Stats
+from prefilter import Prefilter
+from store import Store
+import store
+
+__cache__ = LRUCache()
+__store__ = Store()
+__stats_hook__ = None
+
+class State(object):
+    """
+    state, named by the allocator of the build it belongs to, see
+    `allocator`
 
-class State:
-    """state"""
-    count = 0
-    def __init__(self):
-        self.name = State.count
-        self.move = {}
-        State.count += 1
+    `move` is a list of `(edge, state)` pairs, of which Thompson's
+    construction gives a state at most two
+    """
+    __slots__ = ('name', 'move')
+    def __init__(self, name):
+        self.name = name
+        self.move = []
     def __eq__(self, state):
         assert state.__class__ == State
         return self.name == state.name
     def link(self, state, edge):
         """link to state via edge"""
-        self.move.setdefault(edge, [])
-        if state not in self.move[edge]:
-            self.move[edge].append(state)
+        if (edge, state) not in self.move:
+            self.move.append((edge, state))
         return state
 
-class StateGraph:
-    """state graph"""
-    def __init__(self, start=None, final=None):
+def allocator():
+    """return a function which makes states named 0, 1, 2 and so on"""
+    names = count()
+    return lambda: State(next(names))
+
+class StateGraph(object):
+    """
+    state graph
+
+    `charset` is set iff the graph is a single edge from `start` to
+    `final`, and it is then the label of that edge; `info` is what the
+    strings the graph accepts have in common, see `prefilter.Info`
+    """
+    __slots__ = ('start', 'final', 'charset', 'info')
+    def __init__(self, start=None, final=None, charset=None, info=None):
         self.start = start
         self.final = final
-        self.__all_states__ = []
-    def all_states(self, start):
-        """return all states in the graph from the start state"""
-        if start in self.__all_states__:
-            return self.__all_states__
-        self.__all_states__.append(start)
-        for edge in start.move:
-            for next_state in start.move[edge]:
-                self.all_states(next_state)
-        return self.__all_states__
+        self.charset = charset
+        self.info = info
+    def all_states(self, start=None):
+        """
+        return all states in the graph reachable from `start`, the start
+        state by default, in depth-first order
+        """
+        start = start or self.start
+        seen = {id(start)}
+        result = [start]
+        stack = [start]
+        while stack:
+            for _, next_state in stack.pop().move:
+                if id(next_state) not in seen:
+                    seen.add(id(next_state))
+                    result.append(next_state)
+                    stack.append(next_state)
+        return result
+    def copy(self, new_state):
+        """
+        return a copy of the graph, made of states allocated by
+        `new_state`; the final state must have no edge yet, so that the
+        states reachable from the start state are the ones of the graph
+        """
+        states = self.all_states()
+        copies = dict((id(state), new_state()) for state in states)
+        for state in states:
+            copies[id(state)].move = [ (edge, copies[id(target)])
+                                       for edge, target in state.move ]
+        return StateGraph(copies[id(self.start)], copies[id(self.final)],
+                          self.charset, self.info)
     def make_nfa(self):
-        """make NFA from the state graph"""
+        """
+        make NFA from the state graph in a single depth-first traversal,
+        numbering the nodes 0, 1, 2 and so on in the order they are found
+        """
         nfa = FA()
-        for current in self.all_states(self.start):
-            for edge in current.move:
-                for next_node in current.move[edge]:
-                    nfa.connect(current.name, next_node.name, edge)
-        nfa.set_start(self.start.name)
-        nfa.add_final(self.final.name)
+        index = {id(self.start): 0}
+        stack = [self.start]
+        while stack:
+            current = stack.pop()
+            src = index[id(current)]
+            for edge, next_state in current.move:
+                dst = index.get(id(next_state))
+                if dst is None:
+                    dst = index[id(next_state)] = len(index)
+                    stack.append(next_state)
+                nfa.connect(src, dst, edge)
+        nfa.__start__ = 0
+        nfa.__nodes__.add(0)
+        nfa.add_final(index[id(self.final)])
         return nfa
 
 class RegEx:
-    """Regular Expression based on minimal DFA"""
-    def __init__(self, nfa, pattern, dfa=False):
-        self.__fa__ = nfa.make_dfa().minimize().relabel() if dfa else nfa
+    """
+    Regular Expression based on minimal DFA
+
+    `dfa` selects the engine: True for a minimal DFA compiled to a
+    table, 'codegen' for a minimal DFA compiled to Python source,
+    'lazy' for a DFA built on demand, False for the NFA itself,
+    simulated bit-parallel if it has few enough positions
+
+    the FA is kept only if it is small or it is the minimal DFA; the NFA
+    of the lazy DFA, and too large NFAs, are kept as a `CompactNFA`
+
+    a RegEx can also be made of an already compiled `table`, in which
+    case `nfa` is None
+
+    with `bytes`, the minimal DFA is compiled to a `ByteTable`, which
+    matches `bytes`, `bytearray`, `memoryview` and `mmap` objects in
+    place; `dfa` must then be True
+
+    with the `info` of the parsed pattern, strings are first checked by
+    a `Prefilter`, and the ones it rejects never reach the engine; with
+    a table, strings too short or too long for the pattern do not either,
+    see `Table.lengths`
+
+    the compilation is recorded in `stats`, see `stats`
+    """
+    def __init__(self, nfa, pattern, dfa=False, table=None, stats=None,
+                 bytes=False, info=None):
+        self.__stats__ = stats = stats or Stats(pattern)
+        self.__prefilter__ = stats.count_prefilter(Prefilter.of(info))
+        if bytes and dfa is not True:
+            raise ValueError('bytes mode requires `dfa=True`, but get `%s`'
+                % dfa)
+        if table is not None:
+            self.__fa__ = None
+            self.__engine__ = table
+            if bytes:
+                self.__engine__ = stats.timed('bytes', ByteTable.from_table,
+                                              table)
+            stats.count_table(self.__engine__)
+        elif dfa == 'lazy':
+            self.__fa__ = None
+            self.__engine__ = LazyDFA(stats.count('compact', CompactNFA(nfa)))
+        elif dfa:
+            self.__fa__ = __minimal__(nfa, stats)
+            engine = CodeTable if dfa == 'codegen' else Table
+            self.__engine__ = stats.timed('table', engine, self.__fa__)
+            if bytes:
+                self.__engine__ = stats.timed('bytes', ByteTable.from_table,
+                                              self.__engine__)
+            stats.count_table(self.__engine__)
+        elif BitNFA.positions(nfa) > BitNFA.MAX_POSITIONS:
+            self.__fa__ = None
+            self.__engine__ = stats.count('compact', CompactNFA(nfa))
+        else:
+            self.__fa__ = nfa
+            self.__engine__ = BitNFA(nfa)
+        self.__searcher__ = None
+        self.__lengths__ = None
+        if isinstance(self.__engine__, Table):
+            self.__lengths__ = self.__engine__.lengths()
         self.__pattern__ = pattern
 
-    def match(self, string):
+    def match(self, string, start=0, end=None):
         """
         If `string` matches the regex, then return the string,
         otherwise return None
+
+        with `start` and `end`, string[start:end] is matched, in place if
+        the regex is compiled in bytes mode
         """
-        return self.__fa__.validate(string)
+        __check__(self.__engine__, string)
+        if not __fits__(self.__lengths__, string, start, end, True):
+            return False
+        prefilter = self.__prefilter__
+        if prefilter is not None and \
+                not prefilter.match(string, start, end):
+            return False
+        if isinstance(self.__engine__, ByteTable):
+            return self.__engine__.validate(string, start, end)
+        return self.__engine__.validate(__slice__(string, start, end))
 
     def pattern(self):
         """getter: pattern"""
         return self.__pattern__
 
-    def match_prefix(self, string):
+    def info(self):
+        """
+        getter: the info of the literals of the pattern, see
+        `prefilter.Info`, None if the regex has no prefilter
+        """
+        if self.__prefilter__ is None:
+            return None
+        return self.__prefilter__.info()
+
+    def stats(self):
+        """
+        return the statistics of the compilation: the time of every phase
+        and the sizes of the automata built, see `Stats.as_dict`
+        """
+        return self.__stats__.as_dict()
+
+    def source(self):
+        """
+        getter: Python source generated for the regex, None unless it is
+        compiled with `dfa='codegen'`
+        """
+        if isinstance(self.__engine__, CodeTable):
+            return self.__engine__.source()
+        return None
+
+    def match_prefix(self, string, start=0, end=None):
         """
         return the maximum index that makes self.match(string[:index])
         True, if there is no such index, return 0
 
+        with `start` and `end`, it is the same as
+        self.match_prefix(string[start:end]), see `match`
+
         Note: you can *NEVER* judge whether `string` matches `regex` only
         from this method's return value, because regex like `'a|\\e'`
         matches empty string but this method will return 0 in this case
         """
-        return self.__fa__.try_match(string)
+        __check__(self.__engine__, string)
+        if not __fits__(self.__lengths__, string, start, end):
+            return 0
+        prefilter = self.__prefilter__
+        if prefilter is not None and \
+                not prefilter.match_prefix(string, start, end):
+            return 0
+        if isinstance(self.__engine__, ByteTable):
+            return self.__engine__.try_match(string, start, end)
+        return self.__engine__.try_match(__slice__(string, start, end))
+
+    def match_many(self, strings):
+        """
+        return whether each string of `strings` matches the regex, as a
+        list
+
+        with a DFA compiled to a table and NumPy installed, a batch of
+        `str` only or of `unicode` only is matched in lockstep, see
+        `Table.match_many`; in bytes mode, TypeError is raised if any of
+        them is unicode, see `match`
+        """
+        if isinstance(self.__engine__, Table):
+            strings = __checked__(self.__engine__, strings)
+            return self.__engine__.match_many(strings)
+        return [ self.match(string) for string in strings ]
+
+    def match_prefix_many(self, strings):
+        """
+        return self.match_prefix(string) of each string of `strings`, as
+        a list, see `match_many`
+        """
+        if isinstance(self.__engine__, Table):
+            strings = __checked__(self.__engine__, strings)
+            return self.__engine__.match_prefix_many(strings)
+        return [ self.match_prefix(string) for string in strings ]
+
+    def matcher(self):
+        """return a new resumable `Matcher` of the regex"""
+        return Matcher(self.__engine__)
+
+    def match_stream(self, source, size=CHUNK_SIZE):
+        """
+        whether the whole content of `source`, a file object or an
+        iterable of strings, matches the regex
+
+        the content is read chunk by chunk and never joined
+        """
+        return self.matcher().feed_all(source, size).is_accepting()
+
+    def fa(self):
+        """
+        getter: the minimal DFA or the NFA of the regex, rebuilt from the
+        engine if it is not kept
+        """
+        return self.__fa__ or self.__engine__.to_fa()
+
+    def searcher(self):
+        """getter: searcher, built on the first call"""
+        if self.__searcher__ is None:
+            self.__searcher__ = Searcher(self.fa(), self.__engine__)
+        return self.__searcher__
+
+    def table(self):
+        """return the minimal DFA of the regex compiled to a table"""
+        if isinstance(self.__engine__, Table):
+            return self.__engine__
+        return Table(self.fa().make_dfa().minimize().relabel())
+
+    def save(self, path):
+        """
+        write the minimal DFA of the regex to a compact binary file, which
+        `load` maps back into memory
+        """
+        store.save(self.table(), self.__pattern__, path, self.info())
+
+    def search(self, string, pos=0, end=None):
+        """
+        return the span `(start, end)` of the leftmost-longest substring
+        of string[pos:end] which matches the regex, if there is no such
+        substring, return None
+        """
+        __check__(self.__engine__, string)
+        if not __fits__(self.__lengths__, string, pos, end):
+            return None
+        if self.__prefilter__ is not None:
+            pos = self.__prefilter__.search(string, pos, end)
+            if pos < 0:
+                return None
+        return self.searcher().search(string, pos, end)
+
+    def finditer(self, string, pos=0, end=None):
+        """
+        return an iterator over the spans `(start, end)` of all
+        non-overlapping leftmost-longest matches in string[pos:end]
+        """
+        __check__(self.__engine__, string)
+        if not __fits__(self.__lengths__, string, pos, end):
+            return iter([])
+        if self.__prefilter__ is not None:
+            pos = self.__prefilter__.search(string, pos, end)
+            if pos < 0:
+                return iter([])
+        return self.searcher().finditer(string, pos, end)
+
+    def findall(self, string, pos=0, end=None):
+        """
+        return a list of all non-overlapping leftmost-longest matches
+        in string[pos:end]
+        """
+        return [ string[start:last]
+                 for start, last in self.finditer(string, pos, end) ]
+
+class RegexSet:
+    """
+    several regular expressions matched together, with a single DFA
+    whose final states are tagged with the indices of the patterns
+    """
+    def __init__(self, patterns):
+        self.__patterns__ = list(patterns)
+        nfa = FA.union([ build_nfa(pattern)
+                         for pattern in self.__patterns__ ])
+        self.__fa__ = nfa.make_dfa().minimize().relabel()
+        self.__engine__ = Table(self.__fa__)
+
+    def patterns(self):
+        """getter: patterns"""
+        return self.__patterns__
 
-def compile(pattern, dfa=True):
-    """compile a pattern to RegEx"""
+    def matches(self, string):
+        """
+        return the sorted list of the indices of the patterns which
+        `string` matches
+        """
+        return list(self.__engine__.match_tags(string))
+
+    def match(self, string):
+        """whether `string` matches any of the patterns"""
+        return self.__engine__.validate(string)
+
+def compile(pattern, dfa=True, bytes=False):
+    """
+    compile a pattern to RegEx, `dfa` selects the engine, and `bytes`
+    the bytes mode, see `RegEx`
+
+    compiled patterns are kept in a LRU cache keyed on
+    `(pattern, dfa, bytes)`, see `cache_info`, `purge` and
+    `set_cache_size`
+    """
+    key = (pattern, dfa, bytes)
+    regex = __cache__.get(key)
+    if regex is None:
+        regex = __cache__.put(key, __compile__(pattern, dfa, bytes))
+    return regex
+
+def __compile__(pattern, dfa, bytes=False):
+    """
+    compile a pattern to RegEx, bypassing the cache, but consulting the
+    store of compiled DFAs if any, see `set_store_dir`
+    """
+    stats = Stats(pattern)
+    if bytes or dfa is not True or not __store__.directory():
+        graph = __parse__(pattern, stats)
+        regex = RegEx(__nfa__(graph, stats), pattern, dfa, stats=stats,
+                      bytes=bytes, info=graph.info)
+    else:
+        stored = stats.timed('load', __store__.get, pattern)
+        if stored is not None:
+            table, info = stored
+            regex = RegEx(None, pattern, dfa, table, stats, info=info)
+        else:
+            graph = __parse__(pattern, stats)
+            regex = RegEx(__nfa__(graph, stats), pattern, dfa, stats=stats,
+                          info=graph.info)
+            __store__.put(pattern, regex.table(), graph.info)
+    if __stats_hook__ is not None:
+        __stats_hook__(regex.stats())
+    return regex
+
+def __check__(engine, string):
+    """
+    raise TypeError if `engine` is a `ByteTable` but `string` is unicode,
+    before any other check can reject it silently
+    """
+    if isinstance(string, unicode) and isinstance(engine, ByteTable):
+        raise TypeError('bytes mode requires a byte string, but get unicode')
+
+def __checked__(engine, strings):
+    """return `strings` as a list, each one checked by `__check__`"""
+    strings = list(strings)
+    for string in strings:
+        __check__(engine, string)
+    return strings
+
+def __fits__(lengths, string, start, end, whole=False):
+    """
+    whether string[start:end] is long enough to contain a string of
+    `lengths`, see `Table.lengths`, and if `whole`, short enough to be
+    one; strings without a length always fit
+    """
+    if lengths is None or not hasattr(string, '__len__'):
+        return True
+    size = len(string) if end is None else min(end, len(string))
+    size = max(size - start, 0)
+    if size < lengths[0]:
+        return False
+    return not whole or lengths[1] is None or size <= lengths[1]
+
+def __slice__(string, start, end):
+    """return string[start:end], or `string` itself if it is whole"""
+    if start or end is not None:
+        return string[start:end]
+    return string
+
+def load(path):
+    """load a RegEx from a file written by `RegEx.save`"""
+    pattern, table, info = store.load(path)
+    return RegEx(None, pattern, True, table, info=info)
+
+def set_store_dir(directory):
+    """
+    set the directory where `compile` stores compiled DFAs and looks them
+    up before compiling, None disables it; it defaults to the
+    `YARE_CACHE_DIR` environment variable
+    """
+    __store__.set_directory(directory)
+
+def set_stats_hook(callback):
+    """
+    set a function called with `RegEx.stats()` of every pattern compiled,
+    cache hits excepted, None removes it
+    """
+    global __stats_hook__
+    __stats_hook__ = callback
+
+def build_nfa(pattern, stats=None):
+    """parse a pattern and return its NFA, recording phases in `stats`"""
+    stats = stats or Stats(pattern)
+    return __nfa__(__parse__(pattern, stats), stats)
+
+def __parse__(pattern, stats):
+    """parse a pattern and return its state graph, timed in `stats`"""
     from parser import build
     try:
-        graph = build(pattern)
+        graph = stats.timed('parse', build, pattern)
         if not graph:
             raise SyntaxError()
     except SyntaxError, error:
@@ -88,17 +488,42 @@ def compile(pattern, dfa=True):
             raise SyntaxError("pattern `%s` cannot be parsed" % pattern)
         else:
             raise error
-    nfa = graph.make_nfa()
-    return RegEx(nfa, pattern, dfa)
+    return graph
+
+def __nfa__(graph, stats):
+    """return the NFA of a state graph, recording it in `stats`"""
+    return stats.count('nfa', stats.timed('make_nfa', graph.make_nfa))
+
+def __minimal__(nfa, stats):
+    """return the minimal DFA of `nfa`, recording phases in `stats`"""
+    dfa = stats.count('dfa', stats.timed('make_dfa', nfa.make_dfa))
+    minimal = stats.timed('minimize', dfa.minimize)
+    return stats.count('minimal', stats.timed('relabel', minimal.relabel))
+
+def compile_set(patterns):
+    """compile patterns to a RegexSet"""
+    return RegexSet(patterns)
+
+def cache_info():
+    """return the statistics of the compile cache as a `CacheInfo`"""
+    return __cache__.info()
+
+def purge():
+    """clear the compile cache"""
+    __cache__.purge()
+
+def set_cache_size(maxsize):
+    """set the maximum number of patterns kept by the compile cache"""
+    __cache__.resize(maxsize)
 
-def match(regex, string):
+def match(regex, string, start=0, end=None):
     """
     If `string` matches the regex, then return the string,
     otherwise return None
     """
-    return regex.match(string)
+    return regex.match(string, start, end)
 
-def match_prefix(regex, string):
+def match_prefix(regex, string, start=0, end=None):
     """
     return the maximum index that makes self.match(string[:index])
     True, if there is no such index, return 0
@@ -107,4 +532,19 @@ def match_prefix(regex, string):
     from this method's return value, because regex like `'a|\\e'` matches
     empty string but this method will return 0 in this case
     """
-    return regex.match_prefix(string)
+    return regex.match_prefix(string, start, end)
+
+def search(regex, string, pos=0, end=None):
+    """
+    return the span `(start, end)` of the leftmost-longest substring of
+    string[pos:end] which matches the regex, if there is no such
+    substring, return None
+    """
+    return regex.search(string, pos, end)
+
+def findall(regex, string, pos=0, end=None):
+    """
+    return a list of all non-overlapping leftmost-longest matches in
+    string[pos:end]
+    """
+    return regex.findall(string, pos, end)
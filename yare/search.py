@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# coding:utf-8
+
+"""unanchored search of the leftmost-longest matches"""
+
+from table import Table, ByteTable
+
+class Searcher:
+    """
+    search for matches anywhere in a string
+
+    a DFA of the reversed pattern, prefixed with a loop over any
+    character, is run backward over the string once to mark every index
+    where a match starts; the forward `engine` then extends the leftmost
+    marked index to the longest match; with a `ByteTable` engine, the
+    reverse DFA is a `ByteTable` too
+    """
+    def __init__(self, fa, engine):
+        reverse = fa.reverse().make_dfa(unanchored=True).minimize().relabel()
+        self.__reverse__ = Table(reverse, default=reverse.start_node())
+        if isinstance(engine, ByteTable):
+            self.__reverse__ = ByteTable.from_table(self.__reverse__)
+        self.__engine__ = engine
+
+    def finditer(self, string, pos=0, end=None):
+        """
+        yield the span `(start, end)` of every non-overlapping
+        leftmost-longest match in string[pos:end], `end` being the end of
+        `string` by default
+        """
+        end = len(string) if end is None else min(end, len(string))
+        if pos > end:
+            return
+        marks = self.__reverse__.scan_back(string, pos, end)
+        idx = pos
+        while idx <= end:
+            start = marks.find(b'\x01', idx - pos)
+            if start < 0:
+                return
+            start += pos
+            last = self.__engine__.longest(string, start, end)
+            yield (start, last)
+            idx = last if last > start else last + 1
+
+    def search(self, string, pos=0, end=None):
+        """
+        return the span `(start, end)` of the leftmost-longest match in
+        string[pos:end], if there is no match, return None
+        """
+        for span in self.finditer(string, pos, end):
+            return span
+        return None
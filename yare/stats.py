@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# coding:utf-8
+
+"""statistics of the compilation of patterns"""
+
+import time
+
+class Stats:
+    """
+    wall time of every phase of the compilation of a pattern, and the
+    sizes of the automata built on the way
+    """
+    def __init__(self, pattern):
+        self.__pattern__ = pattern
+        self.__times__ = {}
+        self.__automata__ = {}
+        self.__prefilter__ = None
+
+    def timed(self, phase, func, *args):
+        """return `func(*args)`, adding its wall time to `phase`"""
+        begin = time.time()
+        result = func(*args)
+        self.__times__[phase] = self.__times__.get(phase, 0.0) + \
+            time.time() - begin
+        return result
+
+    def count(self, name, fa):
+        """record the sizes of the FA `fa` under `name`, return `fa`"""
+        self.__automata__[name] = {
+            'states': fa.size(),
+            'edges': fa.edge_count(),
+            'memory': fa.memory(),
+        }
+        return fa
+
+    def count_table(self, table):
+        """record the sizes of `table`, return `table`"""
+        self.__automata__['table'] = {
+            'states': table.size(),
+            'classes': table.width(),
+            'memory': table.memory(),
+        }
+        return table
+
+    def count_prefilter(self, prefilter):
+        """
+        record the checks of `prefilter` as they are done, see
+        `Prefilter.counts`, return `prefilter`
+        """
+        self.__prefilter__ = prefilter
+        return prefilter
+
+    def as_dict(self):
+        """
+        return the statistics as a dict: the pattern, the `times` by
+        phase in seconds and the `total`, then the sizes of every
+        automaton built (`nfa`, `dfa`, `minimal` and `table`): their
+        number of states, of edges or classes, and an estimate of their
+        `memory` in bytes
+
+        with a prefilter, `prefilter` is the number of strings it checked
+        and rejected so far, and its hit rate, the rate of the rejected
+        """
+        result = {
+            'pattern': self.__pattern__,
+            'times': dict(self.__times__),
+            'total': sum(self.__times__.itervalues()),
+        }
+        for name, sizes in self.__automata__.iteritems():
+            result[name] = dict(sizes)
+        if self.__prefilter__ is not None:
+            result['prefilter'] = self.__prefilter__.counts()
+        return result
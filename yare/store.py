@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+# coding:utf-8
+
+"""
+compact binary files of compiled DFAs
+
+a file is made of, all integers little-endian:
+
+    header       magic `YARE`, then uint16 version and flags, then uint32
+                 width, rows, start row, first accept-sink row, minimum
+                 and maximum accepted length (`NONE` if unbounded),
+                 alphabet size, pattern size and info size
+    pattern      the pattern, encoded in UTF-8 if it is unicode
+    info         the literals of the prefilter, see `prefilter.Info`, if
+                 `FLAG_INFO` is set: prefix, suffix, required and first
+                 characters, then the number of exact strings (`NONE` if
+                 there are too many) and the strings, each one a uint32
+                 size and the string, encoded as the pattern
+    alphabet     (code point, class) uint32 pairs
+    padding      up to a multiple of 4 bytes
+    transitions  rows * width int32 premultiplied states, ordered as by
+                 `Table`: the accept-sinks, then the dead state last
+    finals       a bitmap of the final rows
+
+the analysis of the table is stored, so a file is loaded without running
+it again, nor parsing the pattern
+"""
+
+import ctypes
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+from prefilter import Info
+from table import Table
+
+MAGIC = b'YARE'
+VERSION = 2
+HEADER = struct.Struct('<4sHHIIIIIIIII')
+SIZE = struct.Struct('<I')
+NONE = 0xffffffff
+FLAG_UNICODE = 1
+FLAG_INFO = 2
+FLAG_NULLABLE = 4
+
+def __pack_info__(info, encode):
+    """return the bytes of `info`, its strings encoded by `encode`"""
+    strings = [ info.prefix, info.suffix, info.required,
+                ''.join(sorted(info.first)) ]
+    exact = sorted(info.exact) if info.exact is not None else []
+    result = []
+    for string in strings:
+        string = encode(string)
+        result.extend([ SIZE.pack(len(string)), string ])
+    result.append(SIZE.pack(NONE if info.exact is None else len(exact)))
+    for string in exact:
+        string = encode(string)
+        result.extend([ SIZE.pack(len(string)), string ])
+    return b''.join(result)
+
+def __read_size__(data, offset):
+    """return the uint32 at data[offset], and the offset after it"""
+    if offset + SIZE.size > len(data):
+        raise ValueError('truncated info')
+    return SIZE.unpack_from(data, offset)[0], offset + SIZE.size
+
+def __read_string__(data, offset, decode):
+    """
+    return the string at data[offset], decoded by `decode`, and the
+    offset after it
+    """
+    size, offset = __read_size__(data, offset)
+    if offset + size > len(data):
+        raise ValueError('truncated info')
+    return decode(data[offset:offset + size]), offset + size
+
+def __unpack_info__(data, decode, nullable):
+    """return the `Info` of the bytes `data`, see `__pack_info__`"""
+    strings = []
+    offset = 0
+    for _ in xrange(4):
+        string, offset = __read_string__(data, offset, decode)
+        strings.append(string)
+    prefix, suffix, required, first = strings
+    count, offset = __read_size__(data, offset)
+    exact = None
+    if count != NONE:
+        exact = set()
+        for _ in xrange(count):
+            string, offset = __read_string__(data, offset, decode)
+            exact.add(string)
+        exact = frozenset(exact)
+    return Info(exact, prefix, suffix, required, frozenset(first), nullable)
+
+def dump(table, pattern, info=None):
+    """
+    return the bytes of the file of `table` compiled from `pattern`, with
+    `info`, the `prefilter.Info` of the pattern, if it is given
+    """
+    width = table.width()
+    rows = table.size()
+    classes = table.__classes__
+    flags = 0
+    encode = lambda string: string
+    if isinstance(pattern, unicode):
+        flags |= FLAG_UNICODE
+        encode = lambda string: unicode(string).encode('utf-8')
+    pattern = encode(pattern)
+    packed = b''
+    if info is not None:
+        flags |= FLAG_INFO
+        if info.nullable:
+            flags |= FLAG_NULLABLE
+        packed = __pack_info__(info, encode)
+    alphabet = array('I')
+    for char in sorted(classes):
+        alphabet.extend([ ord(char), classes[char] ])
+    transitions = array('i', table.__transitions__)
+    finals = bytearray((rows + 7) // 8)
+    for state in table.__finals__:
+        row = state // width
+        finals[row // 8] |= 1 << (row % 8)
+    if sys.byteorder != 'little':
+        alphabet.byteswap()
+        transitions.byteswap()
+    shortest, longest = table.lengths()
+    head = HEADER.pack(MAGIC, VERSION, flags, width, rows,
+        table.__start__ // width, table.__sink__ // width, shortest,
+        NONE if longest is None else longest, len(classes), len(pattern),
+        len(packed))
+    body = head + pattern + packed + alphabet.tostring()
+    return body + b'\0' * (-len(body) % 4) + transitions.tostring() + \
+        bytes(finals)
+
+def save(table, pattern, path, info=None):
+    """
+    write the file of `table` compiled from `pattern`, with `info`, see
+    `dump`, to `path`
+
+    the file is written aside and renamed, so readers never see a
+    partial file
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as out:
+            out.write(dump(table, pattern, info))
+        os.rename(temp, path)
+    except:
+        os.remove(temp)
+        raise
+
+def load(path):
+    """
+    read the file at `path`, return the pattern, the table and the info,
+    see `loads`
+
+    the file is memory-mapped copy-on-write, which is never written, so
+    on a little-endian machine the transitions are a view of the mapping
+    rather than a copy
+    """
+    with open(path, 'rb') as source:
+        data = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_COPY)
+    pattern, table, info = loads(data, path)
+    table.__mmap__ = data
+    return pattern, table, info
+
+def loads(data, name='<string>'):
+    """
+    read the file content `data`, a string or a buffer such as a
+    mapping, return the pattern, the table and the `prefilter.Info`,
+    None if it is not stored; `name` is used in errors
+
+    the transitions are a view of `data` if it is a writable buffer on
+    a little-endian machine, otherwise a copy; ValueError is raised if
+    `data` is not such a file, or is truncated
+    """
+    if len(data) < HEADER.size:
+        raise ValueError('`%s` is not a compiled regex file' % name)
+    magic, version, flags, width, rows, start, sink, shortest, longest, \
+        size, length, packed = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError('`%s` is not a compiled regex file' % name)
+    if version != VERSION:
+        raise ValueError('`%s` has version %d, but %d is required'
+            % (name, version, VERSION))
+    offset = HEADER.size + length + packed + 8 * size
+    offset += -offset % 4
+    end = offset + 4 * rows * width
+    if not width or not rows or start >= rows or sink >= rows or \
+            len(data) < end + (rows + 7) // 8:
+        raise ValueError('`%s` is truncated or corrupt' % name)
+    decode = lambda string: string
+    to_char = chr
+    if flags & FLAG_UNICODE:
+        decode = lambda string: string.decode('utf-8')
+        to_char = unichr
+    pattern = decode(data[HEADER.size:HEADER.size + length])
+    info = None
+    if flags & FLAG_INFO:
+        begin = HEADER.size + length
+        try:
+            info = __unpack_info__(data[begin:begin + packed], decode,
+                                   bool(flags & FLAG_NULLABLE))
+        except ValueError:
+            raise ValueError('`%s` is truncated or corrupt' % name)
+    begin = HEADER.size + length + packed
+    alphabet = array('I', data[begin:begin + 8 * size])
+    if sys.byteorder != 'little':
+        alphabet.byteswap()
+    classes = { to_char(alphabet[i]): alphabet[i + 1]
+                for i in xrange(0, len(alphabet), 2) }
+    transitions = None
+    if sys.byteorder == 'little':
+        try:
+            transitions = (ctypes.c_int32 * (rows * width)).from_buffer(
+                data, offset)
+        except TypeError:
+            pass
+    if transitions is None:
+        transitions = array('i', data[offset:end])
+        if sys.byteorder != 'little':
+            transitions.byteswap()
+    finals = bytearray(data[end:end + (rows + 7) // 8])
+    finals = [ row * width for row in xrange(rows)
+               if finals[row // 8] >> (row % 8) & 1 ]
+    analysis = (sink * width,
+                (shortest, None if longest == NONE else longest))
+    return pattern, Table.from_arrays(width, classes, transitions,
+        start * width, finals, analysis=analysis), info
+
+class Store:
+    """
+    directory of compiled DFAs, keyed by a hash of their pattern
+
+    the directory is taken from the `YARE_CACHE_DIR` environment
+    variable unless it is set explicitly; None disables the store
+    """
+    def __init__(self, directory=None):
+        self.__directory__ = directory or os.environ.get('YARE_CACHE_DIR')
+
+    def directory(self):
+        """getter: directory"""
+        return self.__directory__
+
+    def set_directory(self, directory):
+        """setter: directory, created if necessary"""
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.__directory__ = directory
+
+    def path(self, pattern):
+        """return the path of the file of `pattern`"""
+        if isinstance(pattern, unicode):
+            pattern = pattern.encode('utf-8')
+        key = hashlib.sha1(b'%d:%s' % (VERSION, pattern)).hexdigest()
+        return os.path.join(self.__directory__, key + '.yare')
+
+    def get(self, pattern):
+        """
+        return the stored table of `pattern` and its info, see `loads`,
+        or None
+        """
+        if not self.__directory__:
+            return None
+        try:
+            stored, table, info = load(self.path(pattern))
+        except (IOError, OSError, ValueError):
+            return None
+        return (table, info) if stored == pattern else None
+
+    def put(self, pattern, table, info=None):
+        """store the table of `pattern`, ignoring I/O errors"""
+        if not self.__directory__:
+            return
+        try:
+            save(table, pattern, self.path(pattern), info)
+        except (IOError, OSError):
+            pass
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# coding:utf-8
+
+"""matching over input which arrives in chunks"""
+
+CHUNK_SIZE = 1 << 16
+
+def iter_chunks(source, size=CHUNK_SIZE):
+    """
+    return an iterator over the chunks of `source`, which is either a
+    file object (binary or text) read `size` characters at a time, or an
+    iterable of strings
+    """
+    if hasattr(source, 'read'):
+        return iter(lambda: source.read(size), source.read(0))
+    return iter(source)
+
+class Matcher:
+    """
+    resumable matcher, which keeps only the current state of the
+    automaton between chunks
+    """
+    def __init__(self, engine):
+        self.__engine__ = engine
+        self.reset()
+
+    def reset(self):
+        """forget all the input fed so far"""
+        self.__state__ = self.__engine__.initial()
+        self.__consumed__ = 0
+        self.__longest__ = 0 if self.__engine__.accepts(self.__state__) \
+            else -1
+        return self
+
+    def feed(self, chunk):
+        """consume the next chunk of input"""
+        if not self.__engine__.is_dead(self.__state__):
+            self.__state__, last = self.__engine__.feed(self.__state__,
+                chunk)
+            if last >= 0:
+                self.__longest__ = self.__consumed__ + last
+        self.__consumed__ += len(chunk)
+        return self
+
+    def feed_all(self, source, size=CHUNK_SIZE):
+        """
+        consume every chunk of `source`, see `iter_chunks`, stopping
+        early once no more input can be accepted
+        """
+        for chunk in iter_chunks(source, size):
+            self.feed(chunk)
+            if self.is_dead():
+                break
+        return self
+
+    def is_accepting(self):
+        """whether the input fed so far matches the regex"""
+        return self.__engine__.accepts(self.__state__)
+
+    def is_dead(self):
+        """whether no further input can make a match"""
+        return self.__engine__.is_dead(self.__state__)
+
+    def longest_match_so_far(self):
+        """
+        return the length of the longest prefix of the input fed so far
+        that matches the regex, if there is no such prefix, return -1
+        """
+        return self.__longest__
+
+    def consumed(self):
+        """getter: number of characters fed so far"""
+        return self.__consumed__
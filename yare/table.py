@@ -0,0 +1,553 @@
+#!/usr/bin/env python
+# coding:utf-8
+
+"""Table-driven Deterministic Finite Automata"""
+
+from itertools import imap
+
+from analysis import analyze
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class Table(object):
+    """
+    compiled DFA: a flat transition table indexed by state and
+    character class
+
+    states are stored premultiplied by the row width, so one step of the
+    automaton is `transitions[state + classes.get(char, 0)]`
+
+    class 0 stands for every character that is not in the alphabet, and
+    leads to the dead state unless a `default` node of the FA is given;
+    the last row is the dead state, which loops to itself
+
+    the table is analyzed once built, see `analysis.analyze`: the states
+    from which no final state is reachable are merged into the dead
+    state, the accept-sinks, from which every string is accepted, are
+    the rows just before it, so that a single comparison with `sink`
+    tells when the result of a run is known; `lengths` bounds the length
+    of the accepted strings
+    """
+    BATCH_TYPES = (bytes, unicode)
+
+    def __init__(self, fa, default=None):
+        nodes = sorted(fa.__nodes__ | {fa.start_node()})
+        index = dict(zip(nodes, range(len(nodes))))
+        dead = len(nodes)
+        fa_map = fa.map()
+        # labels with identical columns share a class
+        columns = {}
+        for label in fa.__acceptable__:
+            column = tuple(
+                index[list(fa_map[node][label])[0]]
+                if node in fa_map and label in fa_map[node] else dead
+                for node in nodes
+            )
+            columns.setdefault(column, []).append(label)
+        width = len(columns) + 1
+        self.__width__ = width
+        self.__classes__ = {}
+        self.__transitions__ = [dead * width] * ((dead + 1) * width)
+        for cls, column in enumerate(sorted(columns), 1):
+            for label in columns[column]:
+                for char in label:
+                    self.__classes__[char] = cls
+            for row, target in enumerate(column):
+                self.__transitions__[row * width + cls] = target * width
+        if default is not None:
+            for row in xrange(dead):
+                self.__transitions__[row * width] = index[default] * width
+        self.__start__ = index[fa.start_node()] * width
+        self.__dead__ = dead * width
+        self.__finals__ = frozenset(
+            index[node] * width for node in fa.final_nodes()
+        )
+        self.__tags__ = {
+            index[node] * width: tuple(sorted(fa.tags(node)))
+            for node in fa.final_nodes() if fa.tags(node)
+        }
+        self.__numpy__ = None
+        self.__analyze__()
+
+    @classmethod
+    def from_arrays(cls, width, classes, transitions, start, finals,
+                    tags=None, analysis=None):
+        """
+        return a table made of its raw parts: `classes` maps characters
+        to classes, `transitions` is any integer sequence of premultiplied
+        states whose last row is the dead state, `start` and `finals` are
+        premultiplied states, and `tags` maps final states to their tags
+
+        `transitions` is kept as it is if the analysis leaves the rows in
+        place, which it does for the tables it has already been run on;
+        `analysis`, the first accept-sink and the `lengths` of such a
+        table, skips it altogether
+        """
+        table = cls.__new__(cls)
+        table.__width__ = width
+        table.__classes__ = classes
+        table.__transitions__ = transitions
+        table.__start__ = start
+        table.__dead__ = len(transitions) - width
+        table.__finals__ = frozenset(finals)
+        table.__tags__ = dict(tags or {})
+        table.__numpy__ = None
+        if analysis is None:
+            table.__analyze__()
+        else:
+            table.__sink__, table.__lengths__ = analysis
+        return table
+
+    def __analyze__(self):
+        """
+        analyze the table, then renumber its rows in the order of the
+        analysis, see `analysis.analyze`, if it is not already theirs
+        """
+        width = self.__width__
+        trans = self.__transitions__
+        order, dead, sinks, self.__lengths__ = analyze(width, trans,
+            self.__start__ // width,
+            [ state // width for state in self.__finals__ ])
+        rows = len(order) - len(dead) + 1
+        self.__sink__ = (rows - 1 - len(sinks)) * width
+        if len(dead) == 1 and order == range(len(order)):
+            return
+        index = dict((row, i) for i, row in enumerate(order[:rows - 1]))
+        for row in dead:
+            index[row] = rows - 1
+        moved = lambda state: index[state // width] * width
+        self.__transitions__ = [ moved(trans[row * width + cls])
+                                 for row in order[:rows - 1]
+                                 for cls in xrange(width) ]
+        self.__transitions__.extend([ (rows - 1) * width ] * width)
+        self.__start__ = moved(self.__start__)
+        self.__dead__ = (rows - 1) * width
+        self.__finals__ = frozenset(imap(moved, self.__finals__))
+        self.__tags__ = dict((moved(state), tags)
+                             for state, tags in self.__tags__.iteritems())
+
+    def to_fa(self):
+        """return the DFA of the table, without the dead state"""
+        from fa import FA
+        width = self.__width__
+        labels = {}
+        for char, cls in self.__classes__.iteritems():
+            labels.setdefault(cls, set()).add(char)
+        fa = FA()
+        for state in xrange(0, self.__dead__, width):
+            for cls in labels:
+                target = self.__transitions__[state + cls]
+                if target != self.__dead__:
+                    fa.connect(state // width, target // width, labels[cls])
+        fa.__start__ = self.__start__ // width
+        fa.__nodes__.add(fa.__start__)
+        for state in self.__finals__:
+            fa.add_final(state // width, self.__tags__.get(state, ()))
+        return fa
+
+    def width(self):
+        """getter: number of character classes, including class 0"""
+        return self.__width__
+
+    def size(self):
+        """getter: number of states, including the dead state"""
+        return len(self.__transitions__) // self.__width__
+
+    def lengths(self):
+        """
+        getter: the minimum and the maximum length of the accepted
+        strings, the latter None if there is no bound
+        """
+        return self.__lengths__
+
+    def is_sink(self, state):
+        """whether every string is accepted from `state`"""
+        return self.__sink__ <= state < self.__dead__
+
+    def memory(self):
+        """return an estimate of the bytes taken by the table"""
+        from sys import getsizeof
+        return getsizeof(self.__transitions__) + \
+            getsizeof(self.__classes__)
+
+    def initial(self):
+        """getter: start state"""
+        return self.__start__
+
+    def accepts(self, state):
+        """whether `state` is a final state"""
+        return state in self.__finals__
+
+    def is_dead(self, state):
+        """whether `state` is the dead state"""
+        return state == self.__dead__
+
+    def step(self, state, edge):
+        """return the state reached from `state` over the character `edge`"""
+        return self.__transitions__[state + self.__classes__.get(edge, 0)]
+
+    def tags(self, state):
+        """return the sorted tags of `state`, see `FA.union`"""
+        return self.__tags__.get(state, ())
+
+    def feed(self, state, edges):
+        """
+        run the DFA over `edges` from `state`, stopping at the dead state
+
+        return the state reached and the maximum index that leads to a
+        final state, if there is no such index, the latter is -1
+        """
+        trans = self.__transitions__
+        get = self.__classes__.get
+        dead = self.__dead__
+        finals = self.__finals__
+        last = -1
+        for i, edge in enumerate(edges):
+            state = trans[state + get(edge, 0)]
+            if state == dead:
+                break
+            if state in finals:
+                last = i+1
+        return state, last
+
+    def validate(self, edges):
+        """
+        validate if a string can be accepted by the DFA
+
+        return True if the string ends in a final state, otherwise False
+        """
+        trans = self.__transitions__
+        get = self.__classes__.get
+        sink = self.__sink__
+        state = self.__start__
+        for edge in edges:
+            state = trans[state + get(edge, 0)]
+            if state >= sink:
+                return state != self.__dead__
+        return state in self.__finals__
+
+    def match_tags(self, edges):
+        """
+        return the sorted tags of the final state the string ends in, see
+        `FA.union`, if the string is not accepted, return an empty tuple
+        """
+        return self.tags(self.feed(self.__start__, edges)[0])
+
+    def try_match(self, edges):
+        """
+        try to match string as long as possible
+
+        return the maximum index that makes self.validate(edges[:index])
+        True, if there is no such index, return 0
+        """
+        trans = self.__transitions__
+        get = self.__classes__.get
+        sink = self.__sink__
+        finals = self.__finals__
+        state = self.__start__
+        if state >= sink:
+            return __count__(edges, 0, edges) if state != self.__dead__ else 0
+        idx = 0
+        it = enumerate(edges, 1)
+        for i, edge in it:
+            state = trans[state + get(edge, 0)]
+            if state >= sink:
+                if state == self.__dead__:
+                    break
+                return __count__(edges, i, it)
+            if state in finals:
+                idx = i
+        return idx
+
+    def longest(self, edges, pos=0, end=None):
+        """
+        return the maximum index that makes
+        self.validate(edges[pos:index]) True, for index up to `end`, the
+        end of `edges` by default; if there is no such index, return -1
+        """
+        if end is None:
+            end = len(edges)
+        trans = self.__transitions__
+        get = self.__classes__.get
+        sink = self.__sink__
+        finals = self.__finals__
+        state = self.__start__
+        if self.is_sink(state):
+            return end
+        last = pos if state in finals else -1
+        for i in xrange(pos, end):
+            state = trans[state + get(edges[i], 0)]
+            if state >= sink:
+                if state == self.__dead__:
+                    break
+                return end
+            if state in finals:
+                last = i+1
+        return last
+
+    def scan_back(self, edges, pos=0, end=None):
+        """
+        run the DFA backward over edges[pos:end], from the last character
+        to the one at `pos`, `end` being the end of `edges` by default
+
+        return a bytearray `marks` where marks[i - pos] is 1 iff the DFA
+        is in a final state after reading edges[i], for pos <= i <= end
+        (i.e., marks[-1] tells whether the start state is final)
+        """
+        if end is None:
+            end = len(edges)
+        trans = self.__transitions__
+        get = self.__classes__.get
+        finals = self.__finals__
+        sink = self.__sink__
+        marks = bytearray(end - pos + 1)
+        state = self.__start__
+        if state in finals:
+            marks[-1] = 1
+        for i in xrange(end - 1, pos - 1, -1):
+            state = trans[state + get(edges[i], 0)]
+            if state >= sink:
+                __stop_back__(self, state, marks, i - pos)
+                break
+            if state in finals:
+                marks[i - pos] = 1
+        return marks
+
+    def __arrays__(self):
+        """
+        return the table as NumPy arrays: the flat transitions, class by
+        code point, and final flag by state
+        """
+        if self.__numpy__ is None:
+            transitions = numpy.array(self.__transitions__, dtype=numpy.intp)
+            codes = [ ord(char) for char in self.__classes__ ]
+            # every code point past the alphabet is clipped to the last
+            # entry, which is class 0
+            classes = numpy.zeros(max(codes or [0]) + 2, dtype=numpy.intp)
+            for char, cls in self.__classes__.iteritems():
+                classes[ord(char)] = cls
+            finals = numpy.zeros(len(transitions), dtype=bool)
+            finals[list(self.__finals__)] = True
+            self.__numpy__ = (transitions, classes, finals)
+        return self.__numpy__
+
+    def __lockstep__(self, strings, prefix):
+        """
+        run the DFA over all `strings` at once, one character position
+        per step, with fancy-indexed lookups over the whole batch
+
+        the strings are concatenated into one array of classes and sorted
+        by decreasing length, so the strings still running at a position
+        are a prefix of the batch
+        """
+        transitions, classes, finals = self.__arrays__()
+        size = len(strings)
+        lengths = numpy.fromiter(imap(len, strings), numpy.intp, size)
+        offsets = numpy.zeros(size, dtype=numpy.intp)
+        numpy.cumsum(lengths[:-1], out=offsets[1:])
+        joined = ''.join(strings)
+        if isinstance(joined, bytes):
+            codes = numpy.frombuffer(joined, dtype=numpy.uint8)
+        else:
+            codes = numpy.frombuffer(joined.encode('utf-32-le'),
+                dtype=numpy.uint32)
+        codes = classes[numpy.minimum(codes, len(classes) - 1)]
+        order = numpy.argsort(-lengths)
+        starts = offsets[order]
+        ascending = lengths[order[::-1]]
+        states = numpy.empty(size, dtype=numpy.intp)
+        states.fill(self.__start__)
+        best = numpy.zeros(size, dtype=numpy.intp)
+        for pos in xrange(ascending[-1] if size else 0):
+            count = size - numpy.searchsorted(ascending, pos, side='right')
+            running = states[:count]
+            running[:] = transitions[running + codes[starts[:count] + pos]]
+            if prefix:
+                best[:count][finals[running]] = pos + 1
+        result = numpy.empty(size, dtype=numpy.intp if prefix else bool)
+        result[order] = best if prefix else finals[states]
+        return result
+
+    def match_many(self, strings):
+        """
+        validate every string of `strings`, return a list of bools
+
+        a batch of strings all of the same type, one of `BATCH_TYPES`, is
+        run in lockstep if NumPy is available, see `__lockstep__`, any
+        other one string by string
+        """
+        strings = list(strings)
+        if not __uniform__(strings, self.BATCH_TYPES):
+            return [ self.validate(string) for string in strings ]
+        return self.__lockstep__(strings, False).tolist()
+
+    def match_prefix_many(self, strings):
+        """
+        return self.try_match(string) of every string of `strings`, as a
+        list, see `match_many`
+        """
+        strings = list(strings)
+        if not __uniform__(strings, self.BATCH_TYPES):
+            return [ self.try_match(string) for string in strings ]
+        return self.__lockstep__(strings, True).tolist()
+
+def __uniform__(strings, types):
+    """
+    whether `strings` can be run in lockstep: NumPy is available and they
+    are all of the same type, one of `types`, so that joining them
+    neither fails nor decodes any of them
+    """
+    kinds = set(imap(type, strings))
+    return numpy is not None and len(kinds) == 1 and kinds <= set(types)
+
+def __count__(edges, done, rest):
+    """
+    return the number of `edges`, of which `done` are consumed and the
+    others are left in the iterator `rest`
+    """
+    try:
+        return len(edges)
+    except TypeError:
+        return done + sum(1 for _ in rest)
+
+def __stop_back__(table, state, marks, index):
+    """
+    finish the marks of `scan_back` once `state`, a dead state or an
+    accept-sink, is reached after marks[index]: the marks up to `index`
+    are all 0 or all 1
+    """
+    if state != table.__dead__:
+        marks[:index + 1] = b'\x01' * (index + 1)
+
+def byte_view(data, start=0, end=None):
+    """
+    return a view of the bytes data[start:end] of `data`, a str,
+    bytearray, memoryview or mmap, without copying them; indexing the
+    view gives characters
+
+    a `unicode` string has no bytes of its own, so TypeError is raised
+    """
+    if isinstance(data, unicode):
+        raise TypeError('bytes mode requires a byte string, but get unicode')
+    size = len(data)
+    end = size if end is None else max(min(end, size), 0)
+    start = min(max(start, 0), end)
+    if isinstance(data, memoryview):
+        return data[start:end]
+    return buffer(data, start, end - start)
+
+class ByteTable(Table):
+    """
+    compiled DFA over bytes: a table of 256 columns, one per byte value,
+    so one step is `transitions[state + byte]`
+
+    strings are taken as `bytes`, `bytearray`, `memoryview` or `mmap`
+    objects, with optional `start` and `end` offsets, and read in place;
+    a character of the pattern stands for the byte of its code point,
+    which must be below 256; batches of `bytes` only are run in lockstep
+    """
+    BATCH_TYPES = (bytes,)
+
+    @classmethod
+    def from_table(cls, table):
+        """return the byte table of `table`"""
+        width = table.width()
+        columns = [ 0 ] * 256
+        for char, column in table.__classes__.iteritems():
+            if ord(char) > 255:
+                raise ValueError('`%s` cannot be matched as a byte' % char)
+            columns[ord(char)] = column
+        trans = table.__transitions__
+        transitions = [ trans[row + column] // width * 256
+                        for row in xrange(0, len(trans), width)
+                        for column in columns ]
+        return cls.from_arrays(256,
+            dict((chr(byte), byte) for byte in xrange(256)), transitions,
+            table.__start__ // width * 256,
+            [ state // width * 256 for state in table.__finals__ ],
+            { state // width * 256: tags
+              for state, tags in table.__tags__.iteritems() })
+
+    def feed(self, state, data, start=0, end=None):
+        """
+        run the DFA over data[start:end] from `state`, stopping at the
+        dead state
+
+        return the state reached and the maximum index, relative to
+        `start`, that leads to a final state, if there is no such index,
+        the latter is -1
+        """
+        trans = self.__transitions__
+        sink = self.__sink__
+        finals = self.__finals__
+        view = byte_view(data, start, end)
+        if self.is_sink(state):
+            return state, len(view)
+        last = -1
+        for i, byte in enumerate(imap(ord, view)):
+            state = trans[state + byte]
+            if state >= sink:
+                if state != self.__dead__:
+                    last = len(view)
+                break
+            if state in finals:
+                last = i+1
+        return state, last
+
+    def validate(self, data, start=0, end=None):
+        """
+        validate if data[start:end] can be accepted by the DFA
+
+        return True if the bytes end in a final state, otherwise False
+        """
+        trans = self.__transitions__
+        sink = self.__sink__
+        state = self.__start__
+        for byte in imap(ord, byte_view(data, start, end)):
+            state = trans[state + byte]
+            if state >= sink:
+                return state != self.__dead__
+        return state in self.__finals__
+
+    def try_match(self, data, start=0, end=None):
+        """
+        return the maximum index that makes
+        self.validate(data[start:end][:index]) True, if there is no such
+        index, return 0
+        """
+        return max(self.feed(self.__start__, data, start, end)[1], 0)
+
+    def longest(self, data, pos=0, end=None):
+        """
+        return the maximum index that makes self.validate(data, pos, index)
+        True, for index up to `end`, the end of `data` by default; if
+        there is no such index, return -1
+        """
+        last = self.feed(self.__start__, data, pos, end)[1]
+        if last >= 0:
+            return pos + last
+        return pos if self.__start__ in self.__finals__ else -1
+
+    def scan_back(self, data, pos=0, end=None):
+        """
+        run the DFA backward over data[pos:end], see `Table.scan_back`
+        """
+        view = byte_view(data, pos, end)
+        trans = self.__transitions__
+        finals = self.__finals__
+        sink = self.__sink__
+        marks = bytearray(len(view) + 1)
+        state = self.__start__
+        if state in finals:
+            marks[-1] = 1
+        for i in xrange(len(view) - 1, -1, -1):
+            state = trans[state + ord(view[i])]
+            if state >= sink:
+                __stop_back__(self, state, marks, i)
+                break
+            if state in finals:
+                marks[i] = 1
+        return marks
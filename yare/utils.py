@@ -18,6 +18,10 @@ ESCAPE_TABLE = {
     '*' : '\*',
     '(' : '\(',
     ')' : '\)',
+    '+' : '\+',
+    '?' : '\?',
+    '{' : '\{',
+    '}' : '\}',
 }
 
 def escape(pattern):
@@ -67,11 +71,26 @@ def loop_(pattern):
     """
     return a regex string which means a loop of `pattern`
 
-    similiar to `((pattern)+)` in other regular expression language
+    same as `((pattern)+)`
     """
     if type(pattern) != str:
         raise TypeError('require type `str`, but get `%s`' % pattern)
-    return group(group(''.join(escape(pattern))) + loop(pattern))
+    return group(group(''.join(escape(pattern))) + '+')
+
+def repeat(pattern, low, high=None):
+    """
+    return a regex string which means `low` to `high` repetitions of
+    `pattern`, at least `low` if `high` is None
+
+    same as `((pattern){low,high})`
+    """
+    if type(pattern) != str:
+        raise TypeError('require type `str`, but get `%s`' % pattern)
+    if high == low:
+        count = '{%d}' % low
+    else:
+        count = '{%d,%s}' % (low, '' if high is None else high)
+    return group(group(''.join(escape(pattern))) + count)
 
 def diff(patterns):
     """
@@ -90,11 +109,11 @@ def optional(pattern):
     """
     return a regex string which means `pattern` is optional
 
-    similiar to `((pattern)?)` in other regular expression language
+    same as `((pattern)?)`
     """
     if type(pattern) != str:
         raise TypeError('require type `str`, but get `%s`' % pattern)
-    return select([pattern, '\\e'])
+    return group(group(''.join(escape(pattern))) + '?')
 
 def range(start, end):
     """